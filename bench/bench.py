@@ -0,0 +1,228 @@
+"""
+Benchmarks the plugin against a fake DokuWiki and an embedded headless
+Neovim, reporting the time and the number of XML-RPC and nvim api requests
+of the common operations.
+
+    python bench/bench.py --pages 1000,10000,100000 --latency 20
+
+Requires pynvim, dokuwiki and an nvim executable.
+"""
+
+import argparse
+import json
+import shutil
+import statistics
+import sys
+import time
+
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+import pynvim
+
+from fakewiki import FakeWiki, FakeWikiServer
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "rplugin" / "python3"))
+
+from DokuVimNG.dokuvimng import DokuVimNG  # noqa: E402
+from DokuVimNG.stats import Stats  # noqa: E402
+
+
+class Bench:
+    """
+    Runs the operations of a plugin instance connected to a fake wiki and
+    collects their timings and request counts.
+    """
+
+    def __init__(self, nvim, server, repeat):
+        self.nvim = nvim
+        self.server = server
+        self.repeat = repeat
+        self.results = []
+
+        self.plugin = DokuVimNG(nvim)
+        self.plugin.stats = Stats()
+        self.plugin.stats.instrument_nvim(nvim)
+
+    def counts(self):
+        stats = self.plugin.stats
+        with stats.lock:
+            counts = {
+                kind: sum(
+                    e["count"] for (k, _), e in stats.methods.items() if k == kind
+                )
+                for kind in ("xmlrpc", "nvim")
+            }
+        with self.server.counts_lock:
+            counts["calls"] = sum(
+                n for (kind, _), n in self.server.counts.items() if kind == "call"
+            )
+        return counts
+
+    def measure(self, name, operation, setup=None, repeat=None):
+        """
+        Runs operation(run) repeat times, setup(run) before each run isn't
+        measured.
+        """
+
+        times = []
+        totals = dict.fromkeys(("xmlrpc", "calls", "nvim"), 0)
+        for run in range(repeat or self.repeat):
+            if setup is not None:
+                setup(run)
+            before = self.counts()
+            start = time.perf_counter()
+            operation(run)
+            times.append(time.perf_counter() - start)
+            after = self.counts()
+            for kind in totals:
+                totals[kind] += after[kind] - before[kind]
+
+        self.results.append(
+            {
+                "pages": len(self.server.wiki.ids),
+                "operation": name,
+                "runs": len(times),
+                "min_ms": min(times) * 1000,
+                "median_ms": statistics.median(times) * 1000,
+                "xmlrpc": totals["xmlrpc"] / len(times),
+                "calls": totals["calls"] / len(times),
+                "nvim": totals["nvim"] / len(times),
+            }
+        )
+
+    def run(self, cache_dir):
+        plugin = self.plugin
+        wiki = self.server.wiki
+
+        # init() shows the help, which needs help tags nvim doesn't have with
+        # -u NONE, they are generated outside the repository
+        runtime = Path(cache_dir) / "runtime"
+        shutil.copytree(ROOT / "doc", runtime / "doc")
+        self.nvim.command("set runtimepath+={}".format(runtime))
+        self.nvim.command("helptags {}".format(runtime / "doc"))
+
+        self.nvim.exec_lua(
+            'require("DokuVimNG").setup(...)',
+            {"cache_dir": cache_dir, "urls": [self.server.url]},
+        )
+        plugin.cfg = self.nvim.exec_lua('return require("DokuVimNG").getConfig()')
+        plugin.dw_url = self.server.url
+        plugin.dw_user = "bench"
+        plugin.dw_pass = "bench"
+
+        self.measure("init", lambda run: plugin.init(), repeat=1)
+        self.measure(
+            "refresh (full)", lambda run: plugin.refresh(full=True, background=False)
+        )
+        self.measure("refresh", lambda run: plugin.refresh(background=False))
+
+        ns = wiki.ids[0].rsplit(":", 1)[0] + ":"
+        self.measure("index", lambda run: plugin.index(ns))
+        self.measure("search", lambda run: plugin.search("page", r"page00012\d"))
+        self.measure(
+            "dwn_complete_pages",
+            lambda run: plugin.dwn_complete_pages([ns + "page0", "", 0]),
+        )
+
+        step = max(1, len(wiki.ids) // self.repeat)
+        pages = [wiki.ids[run * step % len(wiki.ids)] for run in range(self.repeat)]
+        self.measure("edit", lambda run: plugin.edit(pages[run]))
+
+        def change(run):
+            plugin.edit(pages[run])
+            self.nvim.current.buffer.append("benchmark edit {}".format(run))
+
+        self.measure("save", lambda run: plugin.save("benchmark"), setup=change)
+
+        def diff(run):
+            wp = pages[run]
+            plugin.diff("{}\t-\t{}".format(wp, wiki.versions[wp][0]))
+
+        self.measure("diff", diff, setup=lambda run: plugin.edit(pages[run]))
+        plugin.diff_close()
+
+
+def report(results):
+    fmt = "{:>8}  {:24}{:>6}{:>12}{:>12}{:>10}{:>10}{:>10}"
+    lines = [
+        fmt.format(
+            "pages",
+            "operation",
+            "runs",
+            "min ms",
+            "median ms",
+            "xmlrpc",
+            "calls",
+            "nvim",
+        )
+    ]
+    for result in results:
+        lines.append(
+            fmt.format(
+                result["pages"],
+                result["operation"],
+                result["runs"],
+                "{:.1f}".format(result["min_ms"]),
+                "{:.1f}".format(result["median_ms"]),
+                "{:.1f}".format(result["xmlrpc"]),
+                "{:.1f}".format(result["calls"]),
+                "{:.1f}".format(result["nvim"]),
+            )
+        )
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n")[0])
+    parser.add_argument(
+        "--pages", default="1000,10000,100000", help="comma separated sizes"
+    )
+    parser.add_argument("--latency", type=float, default=0, help="in milliseconds")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--no-multicall", action="store_true")
+    parser.add_argument("--nvim", default="nvim", help="nvim executable")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    results = []
+    for pages in [int(n) for n in args.pages.split(",")]:
+        server = FakeWikiServer(
+            FakeWiki(pages),
+            latency=args.latency / 1000,
+            multicall=not args.no_multicall,
+        ).start()
+        nvim = pynvim.attach(
+            "child",
+            argv=[
+                args.nvim,
+                "--embed",
+                "--headless",
+                "-u",
+                "NONE",
+                "-i",
+                "NONE",
+                "--cmd",
+                "set runtimepath+={}".format(ROOT),
+            ],
+        )
+        try:
+            with TemporaryDirectory() as cache_dir:
+                bench = Bench(nvim, server, args.repeat)
+                bench.run(cache_dir)
+                results.extend(bench.results)
+        finally:
+            nvim.close()
+            server.shutdown()
+            server.server_close()
+
+        print("\n".join(report(bench.results)), flush=True)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
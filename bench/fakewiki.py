@@ -0,0 +1,447 @@
+"""
+Stand-in for the XML-RPC api of a DokuWiki with a synthetic dataset, so the
+plugin can be benchmarked without a live wiki.
+
+    python bench/fakewiki.py --pages 10000 --latency 20
+
+serves a wiki with 10000 pages answering every request after 20ms on
+http://127.0.0.1:8080 until interrupted.
+"""
+
+import argparse
+import hashlib
+import re
+import socketserver
+import threading
+import time
+
+from bisect import bisect_left, insort
+from collections import Counter
+from xmlrpc.client import Binary, DateTime, Fault
+from xmlrpc.server import SimpleXMLRPCRequestHandler, SimpleXMLRPCServer
+
+AUTH_EDIT = 2
+AUTH_UPLOAD = 8
+
+LINK_RE = re.compile(r"\[\[([^|\]]+)")
+
+DAY = 60 * 60 * 24
+
+
+class FakeWiki:
+    """
+    Synthetic wiki with the given number of pages, each having a few
+    revisions. Page contents are generated from the page id and revision,
+    only edited pages are stored.
+
+        self.ids        = page ids in generation order
+        self.versions   = page id -> list of revisions, oldest first
+        self.texts      = (page id, revision) -> content of edited revisions
+        self.log        = sorted (timestamp, page id) of all page changes
+        self.media      = media id -> (revision, content)
+    """
+
+    def __init__(self, pages=1000, revisions=3, media=None):
+        self.lock = threading.RLock()
+        self.now = int(time.time())
+
+        self.ids = [self.page_id(i) for i in range(pages)]
+        self.positions = {wp: i for i, wp in enumerate(self.ids)}
+        self.versions = {}
+        self.texts = {}
+        self.log = []
+        start = self.now - revisions * DAY
+        for i, wp in enumerate(self.ids):
+            revs = [start + r * DAY + i % DAY for r in range(revisions)]
+            self.versions[wp] = revs
+            self.log.extend((rev, wp) for rev in revs)
+        self.log.sort()
+        self.generated_size = len(self.generate(self.ids[0], start)) if pages else 0
+
+        if media is None:
+            media = pages // 10
+        self.media = {
+            "ns{}:images:img{:06d}.png".format(i % 20, i): (start + i % DAY, b"")
+            for i in range(media)
+        }
+        self.media_log = sorted((rev, mid) for mid, (rev, _) in self.media.items())
+
+    @staticmethod
+    def page_id(i):
+        return "ns{}:sub{}:page{:06d}".format(i % 20, i // 20 % 25, i)
+
+    def generate(self, wp, rev):
+        i = self.positions[wp]
+        n = len(self.ids)
+        lines = [
+            "====== Page {} ======".format(i),
+            "",
+            "Revision {} of this page, see [[{}]] and [[{}]].".format(
+                rev, self.ids[(i + 1) % n], self.ids[(i + 2) % n]
+            ),
+            "",
+        ]
+        for num in range(20):
+            lines.append(
+                "  * line {} of page {} with some words to search for: "
+                "lorem ipsum dolor sit amet {}".format(num, i, (i * 31 + num) % 997)
+            )
+        return "\n".join(lines) + "\n"
+
+    def text(self, wp, rev=None):
+        with self.lock:
+            revs = self.versions.get(wp)
+            if not revs:
+                return ""
+            if rev is None:
+                rev = revs[-1]
+            elif rev not in revs:
+                return ""
+            text = self.texts.get((wp, rev))
+            if text is None:
+                text = self.generate(wp, rev)
+            return text
+
+    def size(self, wp):
+        with self.lock:
+            revs = self.versions.get(wp)
+            if not revs:
+                return 0
+            text = self.texts.get((wp, revs[-1]))
+            return len(text) if text is not None else self.generated_size
+
+    def exists(self, wp):
+        return bool(self.versions.get(wp))
+
+    def tick(self, last):
+        self.now = max(int(time.time()), last + 1, self.now + 1)
+        return self.now
+
+    def check_page(self, wp):
+        if not self.exists(wp):
+            raise Fault(121, "The requested page does not exist")
+
+    def info(self, wp, rev):
+        return {
+            "name": wp,
+            "lastModified": DateTime(time.gmtime(rev)),
+            "author": "bench",
+            "version": rev,
+        }
+
+    def changes(self, log, timestamp):
+        with self.lock:
+            latest = {}
+            for rev, item in log[bisect_left(log, (timestamp, "")) :]:
+                latest[item] = rev
+        if not latest:
+            raise Fault(321, "There are no changes in the specified timeframe")
+        return latest
+
+    # dokuwiki.*
+
+    def login(self, user, password):
+        return True
+
+    def get_version(self):
+        return "Release 2024-02-06 (fake)"
+
+    def get_time(self):
+        return int(time.time())
+
+    def get_title(self):
+        return "Fake DokuWiki"
+
+    def get_pagelist(self, namespace, options=None):
+        prefix = namespace.strip("/:").replace("/", ":")
+        if prefix:
+            prefix += ":"
+        with self.lock:
+            return [
+                {
+                    "id": wp,
+                    "rev": revs[-1],
+                    "mtime": revs[-1],
+                    "size": self.size(wp),
+                }
+                for wp, revs in self.versions.items()
+                if revs and wp.startswith(prefix)
+            ]
+
+    def search(self, query):
+        query = query.lower()
+        with self.lock:
+            pages = [wp for wp, revs in self.versions.items() if revs]
+        result = []
+        for wp in pages:
+            text = self.text(wp)
+            if query in text.lower():
+                result.append(
+                    {
+                        "id": wp,
+                        "score": 1,
+                        "rev": self.versions[wp][-1],
+                        "mtime": self.versions[wp][-1],
+                        "size": len(text),
+                        "snippet": "",
+                    }
+                )
+        return result
+
+    def set_locks(self, locks):
+        return {
+            "locked": locks.get("lock", []),
+            "lockfail": [],
+            "unlocked": locks.get("unlock", []),
+            "unlockfail": [],
+        }
+
+    # wiki.*
+
+    def acl_check(self, wp):
+        return AUTH_UPLOAD
+
+    def get_page(self, wp):
+        return self.text(wp)
+
+    def get_page_version(self, wp, rev):
+        return self.text(wp, int(rev))
+
+    def get_page_info(self, wp):
+        self.check_page(wp)
+        return self.info(wp, self.versions[wp][-1])
+
+    def get_page_info_version(self, wp, rev):
+        self.check_page(wp)
+        return self.info(wp, int(rev))
+
+    def get_page_versions(self, wp, offset=0):
+        with self.lock:
+            revs = list(reversed(self.versions.get(wp, [])))
+        return [
+            {
+                "user": "bench",
+                "ip": "127.0.0.1",
+                "type": "E",
+                "sum": "revision {}".format(rev),
+                "modified": DateTime(time.gmtime(rev)),
+                "version": rev,
+            }
+            for rev in revs[offset : offset + 25]
+        ]
+
+    def put_page(self, wp, text, options=None):
+        with self.lock:
+            revs = self.versions.setdefault(wp, [])
+            if wp not in self.positions:
+                self.positions[wp] = len(self.ids)
+                self.ids.append(wp)
+            if not text.strip():
+                revs.clear()
+                insort(self.log, (self.tick(0), wp))
+                return True
+            rev = self.tick(revs[-1] if revs else 0)
+            revs.append(rev)
+            self.texts[(wp, rev)] = text
+            insort(self.log, (rev, wp))
+        return True
+
+    def list_links(self, wp):
+        return [
+            {"type": "local", "page": link, "href": "/doku.php?id=" + link}
+            for link in LINK_RE.findall(self.text(wp))
+        ]
+
+    def get_back_links(self, wp):
+        with self.lock:
+            n = len(self.ids)
+            i = self.positions.get(wp)
+            candidates = set(page for (page, _) in self.texts)
+            if i is not None:
+                candidates.update(self.ids[(i - d) % n] for d in (1, 2))
+        return sorted(
+            page
+            for page in candidates
+            if "[[{}]]".format(wp) in self.text(page)
+            or "[[{}|".format(wp) in self.text(page)
+        )
+
+    def get_recent_changes(self, timestamp):
+        changes = self.changes(self.log, timestamp)
+        return [
+            {
+                "name": wp,
+                "lastModified": DateTime(time.gmtime(rev)),
+                "author": "bench",
+                "version": rev,
+                "perms": AUTH_UPLOAD,
+                "size": self.size(wp),
+            }
+            for wp, rev in changes.items()
+        ]
+
+    def get_attachments(self, namespace, options=None):
+        prefix = namespace.strip("/:").replace("/", ":")
+        if prefix:
+            prefix += ":"
+        with_hash = bool((options or {}).get("hash"))
+        with self.lock:
+            result = []
+            for mid, (rev, data) in self.media.items():
+                if not mid.startswith(prefix):
+                    continue
+                entry = {
+                    "id": mid,
+                    "size": len(data) or 1,
+                    "lastModified": DateTime(time.gmtime(rev)),
+                    "isimg": True,
+                    "writable": True,
+                    "perms": AUTH_UPLOAD,
+                }
+                if with_hash:
+                    entry["hash"] = hashlib.md5(data).hexdigest()
+                result.append(entry)
+            return result
+
+    def get_recent_media_changes(self, timestamp):
+        changes = self.changes(self.media_log, timestamp)
+        return [
+            {
+                "name": mid,
+                "lastModified": DateTime(time.gmtime(rev)),
+                "author": "bench",
+                "version": rev,
+                "perms": AUTH_UPLOAD,
+                "size": (len(self.media[mid][1]) or 1) if mid in self.media else 0,
+            }
+            for mid, rev in changes.items()
+        ]
+
+    def get_attachment(self, mid):
+        with self.lock:
+            if mid not in self.media:
+                raise Fault(221, "The requested file does not exist")
+            return Binary(self.media[mid][1])
+
+    def get_attachment_info(self, mid):
+        with self.lock:
+            if mid not in self.media:
+                return {}
+            rev, data = self.media[mid]
+        return {"lastModified": DateTime(time.gmtime(rev)), "size": len(data)}
+
+    def put_attachment(self, mid, data, options=None):
+        with self.lock:
+            rev = self.tick(self.media.get(mid, (0, b""))[0])
+            self.media[mid] = (rev, data.data if isinstance(data, Binary) else data)
+            insort(self.media_log, (rev, mid))
+        return mid
+
+    def delete_attachment(self, mid):
+        with self.lock:
+            self.media.pop(mid, None)
+            insort(self.media_log, (self.tick(0), mid))
+        return 0
+
+    def functions(self):
+        return {
+            "dokuwiki.login": self.login,
+            "dokuwiki.getVersion": self.get_version,
+            "dokuwiki.getTime": self.get_time,
+            "dokuwiki.getTitle": self.get_title,
+            "dokuwiki.getPagelist": self.get_pagelist,
+            "dokuwiki.search": self.search,
+            "dokuwiki.setLocks": self.set_locks,
+            "wiki.aclCheck": self.acl_check,
+            "wiki.getPage": self.get_page,
+            "wiki.getPageVersion": self.get_page_version,
+            "wiki.getPageInfo": self.get_page_info,
+            "wiki.getPageInfoVersion": self.get_page_info_version,
+            "wiki.getPageVersions": self.get_page_versions,
+            "wiki.putPage": self.put_page,
+            "wiki.listLinks": self.list_links,
+            "wiki.getBackLinks": self.get_back_links,
+            "wiki.getRecentChanges": self.get_recent_changes,
+            "wiki.getAttachments": self.get_attachments,
+            "wiki.getRecentMediaChanges": self.get_recent_media_changes,
+            "wiki.getAttachment": self.get_attachment,
+            "wiki.getAttachmentInfo": self.get_attachment_info,
+            "wiki.putAttachment": self.put_attachment,
+            "wiki.deleteAttachment": self.delete_attachment,
+        }
+
+
+class RequestHandler(SimpleXMLRPCRequestHandler):
+    rpc_paths = ("/lib/exe/xmlrpc.php",)
+
+    def do_POST(self):
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        self.server.count("http", "POST")
+        super().do_POST()
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeWikiServer(socketserver.ThreadingMixIn, SimpleXMLRPCServer):
+    """
+    Threaded XML-RPC server for a FakeWiki, delaying every request by latency
+    seconds and counting the requests and method calls.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, wiki, address=("127.0.0.1", 0), latency=0.0, multicall=True):
+        super().__init__(address, RequestHandler, logRequests=False, allow_none=True)
+        self.wiki = wiki
+        self.latency = latency
+        self.counts = Counter()
+        self.counts_lock = threading.Lock()
+
+        for name, function in wiki.functions().items():
+            self.register_function(function, name)
+        if multicall:
+            self.register_multicall_functions()
+
+    @property
+    def url(self):
+        return "http://{}:{}".format(*self.server_address)
+
+    def count(self, kind, method):
+        with self.counts_lock:
+            self.counts[(kind, method)] += 1
+
+    def _dispatch(self, method, params):
+        self.count("call", method)
+        return super()._dispatch(method, params)
+
+    def start(self):
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return self
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n")[0])
+    parser.add_argument("--pages", type=int, default=1000)
+    parser.add_argument("--latency", type=float, default=0, help="in milliseconds")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--no-multicall", action="store_true")
+    args = parser.parse_args()
+
+    server = FakeWikiServer(
+        FakeWiki(args.pages),
+        ("127.0.0.1", args.port),
+        args.latency / 1000,
+        not args.no_multicall,
+    )
+    print("Serving {} pages on {}".format(args.pages, server.url))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -31,6 +31,27 @@ local config = {
 		rule = "equals",
 	},
 	keepassxc_state_file = "~/.DokuVimNG.state",
+	cache_dir = vim.fn.stdpath("cache") .. "/DokuVimNG",
+	async_refresh = false,
+	page_cache_size = 200,
+	page_cache_ttl = 60,
+	prefetch = false,
+	prefetch_workers = 4,
+	complete_limit = 100,
+	stats = false,
+	stats_trace_file = "",
+	revision_cache_size = 50,
+	image_format = "png",
+	image_max_width = 0,
+	image_max_height = 0,
+	image_quality = 85,
+	image_optimize = false,
+	image_max_bytes = 0,
+	media_dedup = true,
+	async_save = false,
+	save_retry = 30,
+	keepassxc_cache_ttl = 600,
+	index_max_age = 604800,
 }
 
 local function setup(cfg)
@@ -0,0 +1,69 @@
+from pynvim.api import NvimError
+
+
+class Batch:
+    """
+    Collects nvim api calls and sends them as a single nvim_call_atomic
+    request when the context is left, instead of one round trip per call.
+
+        with Batch(nvim) as batch:
+            batch.command("setlocal nonumber")
+            num = batch.call("bufnr", "%")
+
+        batch.results[num]
+    """
+
+    def __init__(self, nvim):
+        self._nvim = nvim
+        self.calls = []
+        self.results = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.flush()
+
+    def request(self, method, *args):
+        """
+        Queues an api call and returns the position of its result.
+        """
+
+        self.calls.append([method, list(args)])
+        return len(self.calls) - 1
+
+    def command(self, cmd):
+        return self.request("nvim_command", cmd)
+
+    def call(self, fn, *args):
+        return self.request("nvim_call_function", fn, list(args))
+
+    def set_lines(self, buf, lines):
+        return self.request("nvim_buf_set_lines", buf, 0, -1, True, lines)
+
+    def append_lines(self, buf, lines):
+        return self.request("nvim_buf_set_lines", buf, -1, -1, True, lines)
+
+    def changedtick(self, buf):
+        return self.request("nvim_buf_get_changedtick", buf)
+
+    def set_option(self, buf, name, value):
+        return self.request("nvim_set_option_value", name, value, {"buf": buf.handle})
+
+    def flush(self):
+        """
+        Sends all queued calls. Raises NvimError for the first failing call,
+        the calls before it have been executed.
+        """
+
+        if not self.calls:
+            return self.results
+
+        calls, self.calls = self.calls, []
+        results, error = self._nvim.api.call_atomic(calls)
+        self.results = results
+        if error:
+            index, _, msg = error
+            raise NvimError("{}: {}".format(calls[index][0], msg))
+        return results
@@ -0,0 +1,672 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+
+from collections import OrderedDict
+from pathlib import Path
+from urllib.parse import quote, unquote
+
+
+def wiki_cache_dir(base, url):
+    """
+    Returns the cache directory for the wiki at the given url or None if
+    caching to disk is disabled.
+    """
+
+    if not base:
+        return None
+
+    key = hashlib.sha1(url.encode("utf-8")).hexdigest()
+    path = Path(os.path.expanduser(base)) / key
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def write_atomic(path, data):
+    """
+    Writes data to path by replacing it with a temporary file, so a crash
+    never leaves a truncated cache behind.
+    """
+
+    tmp = path.with_name(path.name + ".tmp")
+    with tmp.open("wb" if isinstance(data, bytes) else "w") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+class IndexCache:
+    """
+    On disk cache of the page and media ids of a wiki. The cache is kept
+    current by applying the recent changes since the last sync.
+
+        self.pages      = set of page ids
+        self.media      = set of media ids
+        self.timestamp  = server time of the last sync (0 if never synced)
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self.pages = set()
+        self.media = set()
+        self.timestamp = 0
+
+    def load(self):
+        """
+        Loads the cache from disk. Returns False if there is nothing usable.
+        """
+
+        if self.path is None or not self.path.exists():
+            return False
+
+        try:
+            with self.path.open("r") as f:
+                data = json.load(f)
+            self.pages = set(data["pages"])
+            self.media = set(data["media"])
+            self.timestamp = int(data["timestamp"])
+        except (OSError, ValueError, KeyError, TypeError):
+            self.pages = set()
+            self.media = set()
+            self.timestamp = 0
+            return False
+
+        return True
+
+    def save(self):
+        if self.path is None:
+            return
+
+        data = {
+            "timestamp": self.timestamp,
+            "pages": sorted(self.pages),
+            "media": sorted(self.media),
+        }
+        try:
+            write_atomic(self.path, json.dumps(data))
+        except OSError:
+            pass
+
+    def copy(self):
+        cache = IndexCache(self.path)
+        cache.reset(self.pages, self.media, self.timestamp)
+        return cache
+
+    def reset(self, pages, media, timestamp):
+        self.pages = set(pages)
+        self.media = set(media)
+        self.timestamp = timestamp
+
+    def update(self, pages=(), media=(), removed=False):
+        """
+        Adds page and media ids changed by this editor or removes them.
+        """
+
+        if removed:
+            self.pages.difference_update(pages)
+            self.media.difference_update(media)
+        else:
+            self.pages.update(pages)
+            self.media.update(media)
+
+    def apply_page_changes(self, changes):
+        """
+        Applies the result of pages.changes(). Deleted pages are reported with
+        a size of zero.
+        """
+
+        for change in changes or []:
+            if change.get("size"):
+                self.pages.add(change["name"])
+            else:
+                self.pages.discard(change["name"])
+
+    def apply_media_changes(self, changes):
+        """
+        Applies the result of medias.changes(). Deleted media files are
+        reported with a size of zero.
+        """
+
+        for change in changes or []:
+            if change.get("size"):
+                self.media.add(change["name"])
+            else:
+                self.media.discard(change["name"])
+
+
+class PageCache:
+    """
+    LRU bounded cache of page contents which is persisted to disk with one
+    file per page. The modification time of a file is the time the entry was
+    last known to be current.
+
+        entry["text"]       = page content
+        entry["version"]    = revision of the content (None if unknown)
+        entry["perm"]       = permission level of the page
+        entry["checked"]    = time the entry was last known to be current
+    """
+
+    def __init__(self, path=None, size=200):
+        self.path = path
+        self.size = size
+        self.entries = OrderedDict()
+        self.lock = threading.RLock()
+
+    def load(self):
+        """
+        Registers the pages cached on disk, least recently used first. Their
+        contents are read on first access.
+        """
+
+        if self.path is None:
+            return
+
+        self.path.mkdir(parents=True, exist_ok=True)
+        files = sorted(self.path.glob("*.json"), key=lambda f: f.stat().st_mtime)
+        with self.lock:
+            for file in files:
+                self.entries[unquote(file.stem)] = None
+            self.evict()
+
+    def file(self, wp):
+        return self.path / "{}.json".format(quote(wp, safe=""))
+
+    def get(self, wp):
+        """
+        Returns the cache entry of a page or None.
+        """
+
+        with self.lock:
+            if wp not in self.entries:
+                return None
+
+            entry = self.entries[wp]
+            if entry is None and self.path is not None:
+                file = self.file(wp)
+                try:
+                    with file.open("r") as f:
+                        entry = json.load(f)
+                    entry["checked"] = file.stat().st_mtime
+                except (OSError, ValueError):
+                    del self.entries[wp]
+                    return None
+                self.entries[wp] = entry
+
+            self.entries.move_to_end(wp)
+            return entry
+
+    def put(self, wp, text, version, perm):
+        with self.lock:
+            entry = {"text": text, "version": version, "perm": perm}
+            if self.path is not None:
+                try:
+                    write_atomic(self.file(wp), json.dumps(entry))
+                except OSError:
+                    pass
+
+            entry["checked"] = time.time()
+            self.entries[wp] = entry
+            self.entries.move_to_end(wp)
+            self.evict()
+
+    def update(self, wp, text):
+        """
+        Stores content written to the wiki. Its revision is unknown until the
+        next freshness check.
+        """
+
+        with self.lock:
+            entry = self.get(wp)
+            self.put(wp, text, None, entry["perm"] if entry else 2)
+
+    def touch(self, wp):
+        """
+        Marks the entry of a page as current.
+        """
+
+        with self.lock:
+            entry = self.get(wp)
+            if entry is None:
+                return
+
+            entry["checked"] = time.time()
+            if self.path is not None:
+                try:
+                    os.utime(self.file(wp))
+                except OSError:
+                    pass
+
+    def discard(self, wp):
+        with self.lock:
+            if self.entries.pop(wp, False) is not False and self.path is not None:
+                try:
+                    self.file(wp).unlink()
+                except OSError:
+                    pass
+
+    def evict(self):
+        while len(self.entries) > self.size:
+            self.discard(next(iter(self.entries)))
+
+
+class RevisionCache:
+    """
+    Cache of old page revisions. Revisions never change, so they are kept on
+    disk for good with one compressed file per revision, while only the most
+    recently used ones are held in memory.
+    """
+
+    def __init__(self, path=None, size=50):
+        self.path = path
+        self.size = size
+        self.entries = OrderedDict()
+        self.lock = threading.RLock()
+
+    def file(self, wp, rev):
+        return self.path / quote(wp, safe="") / "{}.gz".format(rev)
+
+    def get(self, wp, rev):
+        """
+        Returns the content of a revision or None if it isn't cached.
+        """
+
+        key = (wp, str(rev))
+        with self.lock:
+            text = self.entries.get(key)
+            if text is not None:
+                self.entries.move_to_end(key)
+                return text
+
+        if self.path is None:
+            return None
+
+        try:
+            text = gzip.decompress(self.file(*key).read_bytes()).decode("utf-8")
+        except (OSError, ValueError):
+            return None
+
+        self.remember(key, text)
+        return text
+
+    def put(self, wp, rev, text):
+        key = (wp, str(rev))
+        if self.path is not None:
+            file = self.file(*key)
+            try:
+                file.parent.mkdir(parents=True, exist_ok=True)
+                write_atomic(file, gzip.compress(text.encode("utf-8")))
+            except OSError:
+                pass
+
+        self.remember(key, text)
+
+    def remember(self, key, text):
+        with self.lock:
+            self.entries[key] = text
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+
+
+class ChangeLog:
+    """
+    Local copy of the recent changes of a wiki, oldest first. It holds all
+    changes from since up to the high-water mark until, so only the changes
+    after until have to be fetched again.
+
+        change = {"name", "lastModified", "version", "author"}
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self.since = None
+        self.until = None
+        self.changes = []
+
+    def load(self):
+        if self.path is None or not self.path.exists():
+            return
+
+        try:
+            with self.path.open("r") as f:
+                data = json.load(f)
+            self.since = data["since"]
+            self.until = data["until"]
+            self.changes = data["changes"]
+        except (OSError, ValueError, KeyError):
+            self.since = self.until = None
+            self.changes = []
+
+    def save(self):
+        if self.path is None:
+            return
+
+        data = {"since": self.since, "until": self.until, "changes": self.changes}
+        try:
+            write_atomic(self.path, json.dumps(data))
+        except OSError:
+            pass
+
+    def covers(self, timestamp):
+        """
+        Returns whether all changes since timestamp up to until are known.
+        """
+
+        return self.since is not None and timestamp >= self.since
+
+    def add(self, changes, since, until):
+        """
+        Adds the result of pages.changes(since) fetched at server time until
+        and returns the changes which weren't known before. A result not
+        adjoining the log replaces it.
+        """
+
+        if self.until is None or since > self.until or since < self.since:
+            self.since = since
+            self.changes = []
+
+        changes = sorted(changes, key=lambda change: change["version"])
+        oldest = min(since, changes[0]["version"]) if changes else since
+
+        known = set()
+        for change in reversed(self.changes):
+            if change["version"] < oldest:
+                break
+            known.add((change["name"], change["version"]))
+
+        new = []
+        for change in changes:
+            if (change["name"], change["version"]) in known:
+                continue
+            new.append(
+                {
+                    "name": change["name"],
+                    "lastModified": str(change["lastModified"]),
+                    "version": change["version"],
+                    "author": change.get("author", ""),
+                }
+            )
+
+        self.changes.extend(new)
+        self.changes.sort(key=lambda change: change["version"])
+        self.until = max(until, self.until or until)
+        return new
+
+    def query(self, timestamp):
+        """
+        Returns the known changes since timestamp, oldest first.
+        """
+
+        return [change for change in self.changes if change["version"] >= timestamp]
+
+
+class MediaHashes:
+    """
+    Content hashes of the media files of a wiki, persisted to disk. An entry
+    is only trusted as long as the size and modification time reported by
+    the media list match the ones it was recorded with.
+
+        self.entries    = media id -> {"hash": md5, "size": bytes, "mtime": time}
+        self.by_hash    = md5 -> set of media ids
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self.entries = {}
+        self.by_hash = {}
+        self.lock = threading.RLock()
+
+    def load(self):
+        if self.path is None or not self.path.exists():
+            return
+
+        try:
+            with self.path.open("r") as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            return
+
+        with self.lock:
+            for media_id, entry in entries.items():
+                self.add(media_id, entry["hash"], entry["size"], entry["mtime"])
+
+    def save(self):
+        if self.path is None:
+            return
+
+        with self.lock:
+            data = json.dumps(self.entries)
+        try:
+            write_atomic(self.path, data)
+        except OSError:
+            pass
+
+    def find(self, digest):
+        with self.lock:
+            return sorted(self.by_hash.get(digest, ()))
+
+    def add(self, media_id, digest, size, mtime=None):
+        with self.lock:
+            self.discard(media_id)
+            self.entries[media_id] = {"hash": digest, "size": size, "mtime": mtime}
+            self.by_hash.setdefault(digest, set()).add(media_id)
+
+    def discard(self, media_id):
+        with self.lock:
+            entry = self.entries.pop(media_id, None)
+            if entry is None:
+                return
+
+            ids = self.by_hash.get(entry["hash"])
+            if ids is not None:
+                ids.discard(media_id)
+                if not ids:
+                    del self.by_hash[entry["hash"]]
+
+    def update(self, listing):
+        """
+        Applies the result of medias.list(). Listed hashes are recorded, the
+        entries of media files with another size or modification time are
+        dropped as the files were replaced.
+        """
+
+        with self.lock:
+            for item in listing:
+                media_id = item["id"]
+                size = item.get("size")
+                mtime = str(item.get("lastModified", "")) or None
+
+                if item.get("hash"):
+                    self.add(media_id, item["hash"], size, mtime)
+                    continue
+
+                entry = self.entries.get(media_id)
+                if entry is None:
+                    continue
+                if entry["size"] != size or (
+                    entry["mtime"] is not None and entry["mtime"] != mtime
+                ):
+                    self.discard(media_id)
+                else:
+                    entry["mtime"] = mtime
+
+
+class SaveQueue:
+    """
+    Page saves waiting to be written to the wiki, backed by an append only
+    journal so queued saves survive restarts. Saving a page again before
+    the previous save was written replaces the queued one.
+
+        self.entries[page id]   = {"seq", "text", "sum", "minor", "time", "error"}
+
+    A journal line either queues a save or marks the save with the given
+    sequence number as written. The journal is truncated once the queue is
+    empty.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self.entries = OrderedDict()
+        self.seq = 0
+        self.lock = threading.RLock()
+
+    def __contains__(self, wp):
+        return wp in self.entries
+
+    def __len__(self):
+        return len(self.entries)
+
+    def load(self):
+        if self.path is None or not self.path.exists():
+            return
+
+        try:
+            with self.path.open("r") as f:
+                lines = f.readlines()
+        except OSError:
+            return
+
+        with self.lock:
+            for line in lines:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # a crash while appending leaves a truncated last line
+                    continue
+
+                self.seq = max(self.seq, record["seq"])
+                if record["op"] == "put":
+                    self.queue(record)
+                else:
+                    self.remove(record["wp"], record["seq"])
+
+            # rewrite the journal with the queued saves only, which also
+            # drops a truncated last line
+            data = "".join(
+                json.dumps(
+                    {
+                        "op": "put",
+                        "seq": entry["seq"],
+                        "wp": wp,
+                        "text": entry["text"],
+                        "sum": entry["sum"],
+                        "minor": entry["minor"],
+                        "time": entry["time"],
+                    }
+                )
+                + "\n"
+                for wp, entry in self.entries.items()
+            )
+            try:
+                write_atomic(self.path, data)
+            except OSError:
+                pass
+
+    def append(self, record):
+        if self.path is None:
+            return
+
+        with self.path.open("a") as f:
+            f.write(json.dumps(record) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def queue(self, record):
+        previous = self.entries.pop(record["wp"], None)
+        minor = record["minor"]
+        if previous is not None:
+            minor = min(minor, previous["minor"])
+
+        self.entries[record["wp"]] = {
+            "seq": record["seq"],
+            "text": record["text"],
+            "sum": record["sum"],
+            "minor": minor,
+            "time": record["time"],
+            "error": None,
+        }
+
+    def remove(self, wp, seq):
+        entry = self.entries.get(wp)
+        if entry is not None and entry["seq"] == seq:
+            del self.entries[wp]
+
+    def put(self, wp, text, sum="", minor=0):
+        """
+        Queues a page save. Raises OSError if the journal can't be written.
+        """
+
+        with self.lock:
+            self.seq += 1
+            record = {
+                "op": "put",
+                "seq": self.seq,
+                "wp": wp,
+                "text": text,
+                "sum": sum,
+                "minor": minor,
+                "time": time.time(),
+            }
+            self.append(record)
+            self.queue(record)
+
+    def get(self, wp):
+        with self.lock:
+            entry = self.entries.get(wp)
+            return dict(entry) if entry is not None else None
+
+    def pending(self):
+        """
+        Returns (page id, entry copy) of all saves not marked as failed in
+        queue order.
+        """
+
+        with self.lock:
+            return [
+                (wp, dict(entry))
+                for wp, entry in self.entries.items()
+                if entry["error"] is None
+            ]
+
+    def items(self):
+        with self.lock:
+            return [(wp, dict(entry)) for wp, entry in self.entries.items()]
+
+    def done(self, wp, seq):
+        """
+        Marks a save as written unless the page was queued again meanwhile.
+        """
+
+        with self.lock:
+            self.remove(wp, seq)
+            try:
+                if self.entries:
+                    self.append({"op": "done", "seq": seq, "wp": wp})
+                elif self.path is not None:
+                    write_atomic(self.path, "")
+            except OSError:
+                pass
+
+    def failed(self, wp, seq, error):
+        """
+        Marks a save the wiki rejected, it isn't retried before the page is
+        saved again or retry() is called.
+        """
+
+        with self.lock:
+            entry = self.entries.get(wp)
+            if entry is not None and entry["seq"] == seq:
+                entry["error"] = error
+
+    def retry(self):
+        with self.lock:
+            for entry in self.entries.values():
+                entry["error"] = None
+
+    def discard(self, wp):
+        with self.lock:
+            entry = self.entries.get(wp)
+            if entry is not None:
+                self.done(wp, entry["seq"])
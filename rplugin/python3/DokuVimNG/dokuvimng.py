@@ -1,32 +1,68 @@
+import time
+
+LOAD_START = time.perf_counter()
+
 import sys
 import os
 import re
+import hashlib
+import importlib.util
 
 from pathlib import Path
 
-from PIL import ImageGrab
-from tempfile import TemporaryDirectory
-
-import time
+import threading
 import pynvim
 
+from concurrent.futures import ThreadPoolExecutor, wait
+from xmlrpc.client import ProtocolError
+
+from DokuVimNG.batch import Batch
+from DokuVimNG.cache import (
+    ChangeLog,
+    IndexCache,
+    MediaHashes,
+    PageCache,
+    RevisionCache,
+    SaveQueue,
+    wiki_cache_dir,
+)
+from DokuVimNG.index import PageIndex, complete
+from DokuVimNG.links import LinkGraph
+from DokuVimNG.search import FullTextIndex
+from DokuVimNG.stats import StartupTimes, Stats
+from DokuVimNG.wiki import Wiki, WikiAttribute, wiki_alias
+
 __author__ = "Matthias Fulz <mfulz@olznet.de>"
 __license__ = "MIT"
 __maintainer__ = "Matthias Fulz <mfulz@olznet.de>"
 
-try:
-    import dokuwiki
+# dokuwiki, keepassxc_browser and PIL are imported on first use as importing
+# them at load time slows down the start of the remote plugin host
+has_dokuwiki = importlib.util.find_spec("dokuwiki") is not None
+has_keepassxc = importlib.util.find_spec("keepassxc_browser") is not None
 
-    has_dokuwiki = True
-except ImportError:
-    has_dokuwiki = False
+dokuwiki = None
+MultiCall = None
 
-try:
-    from keepassxc_browser import Connection, Identity, ProtocolError
 
-    has_keepassxc = True
-except ImportError:
-    has_keepassxc = False
+def import_dokuwiki():
+    """
+    Imports the dokuwiki module and the modules depending on it.
+    """
+
+    global dokuwiki, MultiCall
+
+    if dokuwiki is None:
+        import dokuwiki
+        from DokuVimNG.multicall import MultiCall
+
+
+def digest(text):
+    """
+    Returns the hash used to compare buffer contents with saved page texts.
+    """
+
+    return hashlib.sha1(text.strip().encode("utf-8")).digest()
 
 
 @pynvim.plugin
@@ -35,29 +71,166 @@ class DokuVimNG:
     Glue class to provide the functionality to interface between the DokuWiki API and vim.
     """
 
+    # state of the wiki the plugin currently works for
+    clients = WikiAttribute()
+    xmlrpc = WikiAttribute()
+    buffers = WikiAttribute()
+    needs_refresh = WikiAttribute()
+    history = WikiAttribute()
+    changes_view = WikiAttribute()
+    cur_ns = WikiAttribute()
+    page_index = WikiAttribute()
+    refreshing = WikiAttribute()
+    index_updates = WikiAttribute()
+    worker = WikiAttribute()
+    prefetching = WikiAttribute()
+    saver = WikiAttribute()
+    save_retry = WikiAttribute()
+    offline = WikiAttribute()
+    cache_dir = WikiAttribute()
+    index_cache = WikiAttribute()
+    page_cache = WikiAttribute()
+    revision_cache = WikiAttribute()
+    media_hashes = WikiAttribute()
+    change_log = WikiAttribute()
+    fulltext = WikiAttribute()
+    links = WikiAttribute()
+    save_queue = WikiAttribute()
+
     def __init__(self, nvim):
         self._nvim = nvim
         self.initialized = False
+        self.wikis = {}
+        self.current = None
+        self.local = threading.local()
+        self.stats = None
+        self.startup = StartupTimes()
+        self.startup.record("load", LOAD_TIME)
+        self.init_start = None
+        self.keepassxc = None
+        self.credentials = {}
 
     def init(self):
+        """
+        Connects to the wiki at dw_url and makes it the current one. Wikis
+        connected before stay connected.
+        """
+
+        self.init_start = time.perf_counter()
+        previous = self.current
+        # buffer names are prefixed as soon as they could collide with the
+        # buffers of another wiki
+        self.current = Wiki(
+            self.dw_url,
+            self.dw_user,
+            self.dw_pass,
+            len(self.cfg["urls"]) > 1 or len(self.wikis) > 0,
+        )
         if self.xmlrpc_init():
+            self.wikis[self.current.alias] = self.current
+
+            # creating a buffer shows it in the current window, the edit window
+            # gets its buffer back once the buffers of another wiki exist
+            shown = self._nvim.call("winbufnr", 2) if self.initialized else None
             self.buffers = {}
-            self.buffers["search"] = Buffer(self._nvim, "search", "nofile")
-            self.buffers["backlinks"] = Buffer(self._nvim, "backlinks", "nofile")
-            self.buffers["revisions"] = Buffer(self._nvim, "revisions", "nofile")
-            self.buffers["changes"] = Buffer(self._nvim, "changes", "nofile")
-            self.buffers["index"] = Buffer(self._nvim, "index", "nofile")
-            self.buffers["media"] = Buffer(self._nvim, "media", "nofile")
-            self.buffers["help"] = Buffer(self._nvim, "help", "nofile")
+            for name in [
+                "search",
+                "backlinks",
+                "revisions",
+                "changes",
+                "index",
+                "media",
+                "help",
+                "stats",
+                "links",
+                "queue",
+            ]:
+                self.buffers[name] = Buffer(
+                    self._nvim, self.current.prefix + name, "nofile"
+                )
 
             self.needs_refresh = False
-            self.diffmode = False
+            self.history = None
+            self.changes_view = None
 
-            self.hdlevel = 0
-            self.headlines = ["=====  =====", "====  ====", "===  ===", "== =="]
+            if not self.initialized:
+                self.diffmode = False
+                self.diff_buffer = None
+
+                self.hdlevel = 0
+                self.headlines = ["=====  =====", "====  ====", "===  ===", "== =="]
+
+                self.prefetcher = ThreadPoolExecutor(
+                    max_workers=self.cfg["prefetch_workers"],
+                    thread_name_prefix="DokuVimNG-prefetch",
+                )
 
             self.cur_ns = ""
-            self.pages = []
+            self.page_index = PageIndex()
+            self.refreshing = False
+            self.index_updates = []
+            self.worker = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix="DokuVimNG-" + self.current.alias
+            )
+            self.prefetching = []
+            self.saver = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix="DokuVimNG-save"
+            )
+            self.save_retry = None
+            self.offline = False
+
+            try:
+                self.cache_dir = wiki_cache_dir(self.cfg["cache_dir"], self.dw_url)
+            except OSError as err:
+                self._nvim.err_write("DokuVimNG cache disabled: {}\n".format(err))
+                self.cache_dir = None
+
+            self.index_cache = IndexCache(
+                self.cache_dir / "index.json" if self.cache_dir else None
+            )
+            if self.index_cache.load():
+                self.build_index()
+
+            self.page_cache = PageCache(
+                self.cache_dir / "pages" if self.cache_dir else None,
+                self.cfg["page_cache_size"],
+            )
+            self.page_cache.load()
+
+            self.revision_cache = RevisionCache(
+                self.cache_dir / "revisions" if self.cache_dir else None,
+                self.cfg["revision_cache_size"],
+            )
+
+            self.media_hashes = MediaHashes(
+                self.cache_dir / "media.json" if self.cache_dir else None
+            )
+            self.media_hashes.load()
+
+            self.change_log = ChangeLog(
+                self.cache_dir / "changes.json" if self.cache_dir else None
+            )
+            self.change_log.load()
+
+            self.fulltext = FullTextIndex(
+                self.cache_dir / "fulltext" if self.cache_dir else None
+            )
+            self.links = LinkGraph()
+            # loading takes a while for large wikis and must not hold up the
+            # refreshes queued on the worker
+            threading.Thread(
+                target=self.in_wiki, args=(self.wiki, self.load_fulltext), daemon=True
+            ).start()
+
+            self.save_queue = SaveQueue(
+                self.cache_dir / "journal.jsonl" if self.cache_dir else None
+            )
+            self.save_queue.load()
+            if len(self.save_queue):
+                self._nvim.out_write(
+                    "{} queued saves pending.\n".format(len(self.save_queue))
+                )
+                self.flush_queue()
 
             self.default_sum = self.cfg["save_summary"]
             self.img_sub_ns = self.cfg["image_sub_ns"]
@@ -65,6 +238,11 @@ class DokuVimNG:
             self.index_winwith = self.cfg["index_winwidth"]
             self.index(self.cur_ns, True)
 
+            if self.initialized:
+                self.focus(2)
+                self._nvim.command("silent! buffer! {}".format(shown))
+                return True
+
             splitright = self._nvim.options["splitright"]
             if splitright:
                 self._nvim.command("set splitright!")
@@ -76,16 +254,82 @@ class DokuVimNG:
                 self._nvim.command("set splitright")
 
             self.initialized = True
+            self.startup.record("init", time.perf_counter() - self.init_start)
 
             self.help()
             # vim.command(
             #     "command! -nargs=0 DokuVimKi echo 'DokuVimKi is already running!'"
             # )
             return True
+
+        self.current = previous
         return False
 
+    @property
+    def wiki(self):
+        """
+        The wiki the calling code works for. Jobs of worker threads and their
+        callbacks keep the wiki they were started for, everything else works
+        for the current wiki.
+        """
+
+        return getattr(self.local, "wiki", None) or self.current
+
+    def in_wiki(self, wiki, fn, *args):
+        """
+        Calls fn working for the given wiki.
+        """
+
+        previous = getattr(self.local, "wiki", None)
+        self.local.wiki = wiki
+        try:
+            return fn(*args)
+        finally:
+            self.local.wiki = previous
+
+    def submit(self, executor, fn, *args):
+        """
+        Runs fn on a worker thread for the wiki the caller works for.
+        """
+
+        return executor.submit(self.in_wiki, self.wiki, fn, *args)
+
+    def async_call(self, fn, *args):
+        """
+        Runs fn on the main thread for the wiki the caller works for.
+        """
+
+        self._nvim.async_call(self.in_wiki, self.wiki, fn, *args)
+
+    @pynvim.command("DWNwiki", nargs="?", sync=True)
+    def dwn_wiki(self, args):
+        if not self.dwn_init():
+            return
+
+        if len(args) == 1:
+            self.dwn_set_url(args)
+        else:
+            self.get_url()
+
+    def switch_wiki(self, wiki):
+        """
+        Makes a connected wiki the current one and shows its index.
+        """
+
+        if self.diffmode:
+            self.diff_close()
+
+        self.current = wiki
+        self.index(self.cur_ns)
+        self.focus(2)
+
     @pynvim.function("DWNsetUrl")
     def dwn_set_url(self, args):
+        wiki = self.wikis.get(wiki_alias(args[0]))
+        if wiki is not None:
+            self.switch_wiki(wiki)
+            return
+
         self.dw_url = args[0]
         self.get_login()
 
@@ -102,17 +346,86 @@ class DokuVimNG:
         if not self.cfg["keepassxc"]:
             self._nvim.exec_lua('require("DokuVimNG").selectCredential()')
         else:
+            start = time.perf_counter()
             try:
                 self.get_login_keepassxc()
             except Exception as err:
                 self._nvim.err_write(
                     "Error getting credentials from KeePassXC: {}\n".format(err)
                 )
+            self.startup.record("credentials", time.perf_counter() - start)
 
     def get_login_keepassxc(self):
+        choices = "{"
+        for login in self.keepassxc_logins(self.dw_url):
+            choices = "{}{{user='{}',pass='{}',group='{}',name='{}'}},".format(
+                choices,
+                login.get("login", ""),
+                login.get("password", ""),
+                login.get("group", ""),
+                login.get("name", ""),
+            )
+        choices = "{}}}".format(choices)
+        self._nvim.exec_lua('require("DokuVimNG").selectCredential({})'.format(choices))
+
+    def keepassxc_logins(self, url):
+        """
+        Returns the KeePassXC logins for url which pass keepassxc_match. They
+        are kept in memory for keepassxc_cache_ttl seconds.
+        """
+
+        ttl = self.cfg["keepassxc_cache_ttl"]
+        cached = self.credentials.get(url)
+        if cached is not None and time.monotonic() - cached[0] < ttl:
+            return cached[1]
+
+        c, id = self.keepassxc_connection()
+        try:
+            logins = c.get_logins(id, url=url)
+        except Exception:
+            # KeePassXC was restarted or the connection timed out
+            self.keepassxc = None
+            c, id = self.keepassxc_connection()
+            logins = c.get_logins(id, url=url)
+
+        logins = [login for login in logins if self.keepassxc_matches(login)]
+        if ttl > 0:
+            self.credentials[url] = (time.monotonic(), logins)
+        return logins
+
+    def keepassxc_matches(self, login):
+        matcher = self.cfg["keepassxc_match"]
+        if len(matcher) > 0:
+            field = matcher["field"]
+            match = matcher["match"]
+            rule = matcher["rule"]
+
+            if match:
+                value = login.get(field, "")
+                if value:
+                    if rule == "contains":
+                        if match not in value:
+                            return False
+                    elif rule == "equals":
+                        if match != value:
+                            return False
+        return True
+
+    def keepassxc_connection(self):
+        """
+        Returns the KeePassXC connection and identity. The connection is kept
+        open for the whole session, so the key exchange and the association
+        check only happen once.
+        """
+
+        if self.keepassxc is not None:
+            return self.keepassxc
+
         if not has_keepassxc:
             raise Exception("Python moodule keepassxc_browser missing")
 
+        from keepassxc_browser import Connection, Identity
+
         client_id = self.cfg["keepassxc_id"]
         state_file = Path(os.path.expanduser(self.cfg["keepassxc_state_file"]))
         if state_file.exists():
@@ -135,33 +448,8 @@ class DokuVimNG:
                 f.write(data)
             del data
 
-        choices = "{"
-        logins = c.get_logins(id, url=self.dw_url)
-        for login in logins:
-            matcher = self.cfg["keepassxc_match"]
-            if len(matcher) > 0:
-                field = matcher["field"]
-                match = matcher["match"]
-                rule = matcher["rule"]
-
-                if match:
-                    value = login.get(field, "")
-                    if value:
-                        if rule == "contains":
-                            if match not in value:
-                                continue
-                        elif rule == "equals":
-                            if match != value:
-                                continue
-            choices = "{}{{user='{}',pass='{}',group='{}',name='{}'}},".format(
-                choices,
-                login.get("login", ""),
-                login.get("password", ""),
-                login.get("group", ""),
-                login.get("name", ""),
-            )
-        choices = "{}}}".format(choices)
-        self._nvim.exec_lua('require("DokuVimNG").selectCredential({})'.format(choices))
+        self.keepassxc = (c, id)
+        return self.keepassxc
 
     def xmlrpc_init(self):
         """
@@ -169,14 +457,38 @@ class DokuVimNG:
         """
 
         try:
-            self.xmlrpc = dokuwiki.DokuWiki(
-                self.dw_url, self.dw_user, self.dw_pass, cookieAuth=True
-            )
+            start = time.perf_counter()
+            import_dokuwiki()
+            self.startup.record("import dokuwiki", time.perf_counter() - start)
+
+            self.clients = threading.local()
+            self.xmlrpc = self.clients.xmlrpc = self.connect()
             return True
         except (dokuwiki.DokuWikiError, Exception) as err:
+            # the cached logins might be outdated
+            self.credentials.pop(self.dw_url, None)
             self._nvim.err_write("DokuVimNG Error: {}\n".format(err))
             return False
 
+    def connect(self):
+        xmlrpc = dokuwiki.DokuWiki(
+            self.wiki.url, self.wiki.user, self.wiki.password, cookieAuth=True
+        )
+        if self.stats is not None:
+            self.stats.instrument_xmlrpc(xmlrpc)
+        return xmlrpc
+
+    def client(self):
+        """
+        Returns the xmlrpc connection of the calling thread. Worker threads get
+        their own connection as the transport can't be shared between threads.
+        """
+
+        xmlrpc = getattr(self.clients, "xmlrpc", None)
+        if xmlrpc is None:
+            xmlrpc = self.clients.xmlrpc = self.connect()
+        return xmlrpc
+
     @pynvim.command("DWNinit", nargs=0, sync=True)
     def dwn_init(self):
         if self.initialized:
@@ -186,11 +498,28 @@ class DokuVimNG:
             self._nvim.err_write("DokuVimNG Error: Missing dokuwiki python module\n")
             return False
 
+        start = time.perf_counter()
         self.cfg = self._nvim.exec_lua('return require("DokuVimNG").getConfig()')
+        self.startup.record("config", time.perf_counter() - start)
+
+        if self.cfg["stats"] and self.stats is None:
+            try:
+                self.stats = Stats(self.cfg["stats_trace_file"])
+                self.stats.instrument_nvim(self._nvim)
+            except OSError as err:
+                self._nvim.err_write("DokuVimNG Error: {}\n".format(err))
 
         self.get_url()
         return False
 
+    @pynvim.command("DWNstartupTime", nargs=0, sync=True)
+    def dwn_startup_time(self):
+        """
+        Shows the durations of the startup phases recorded so far.
+        """
+
+        self._nvim.out_write("\n".join(self.startup.report()) + "\n")
+
     @pynvim.command("DWNhelp", nargs=0, sync=True)
     def help(self):
         """
@@ -207,8 +536,56 @@ class DokuVimNG:
         self._nvim.command("help DokuVimNG")
         self._nvim.command("setlocal statusline=%{'[help]'}")
 
+    @pynvim.command("DWNstats", nargs=0, bang=True, sync=True)
+    def dwn_stats(self, bang):
+        if not self.dwn_init():
+            return
+
+        if self.stats is None:
+            self._nvim.err_write("DokuVimNG Error: Statistics are disabled\n")
+            return
+
+        if bang:
+            self.stats.reset()
+
+        self.show_stats()
+
+    def show_stats(self):
+        """
+        Shows the collected call statistics.
+        """
+
+        if self.diffmode:
+            self.diff_close()
+
+        self.focus(2)
+
+        buf = self.buffers["stats"].buf
+        with Batch(self._nvim) as batch:
+            batch.command("silent! buffer! {}".format(self.buffers["stats"].num))
+            batch.command("setlocal nowrap")
+            batch.set_option(buf, "modifiable", True)
+            batch.set_lines(buf, self.stats.report())
+            batch.set_option(buf, "modifiable", False)
+
+    @pynvim.function("DWNcompleteIndex", sync=True)
+    def dwn_complete_index(self, args):
+        return self.complete(args, self.page_index.entries)
+
     @pynvim.function("DWNcompletePages", sync=True)
     def dwn_complete_pages(self, args):
+        return self.complete(args, self.page_index.pages)
+
+    @pynvim.function("DWNcompleteNamespaces", sync=True)
+    def dwn_complete_namespaces(self, args):
+        return self.complete(args, self.page_index.namespaces)
+
+    def complete(self, args, items):
+        """
+        Returns the entries of the sorted list items matching the argument
+        to complete, at most complete_limit of them.
+        """
+
         if not self.dwn_init():
             return
 
@@ -216,20 +593,12 @@ class DokuVimNG:
             self._nvim.err_write("Wrong number of arguments\n")
             return
 
-        ret = []
-        matches = []
         arglead = args[0]
-        cmdline = args[1]
-        cursorpos = int(args[2])
-
-        for page in self.pages:
-            if page.startswith(arglead):
-                ret.append(page)
 
-        return ret
+        return complete(items, arglead, self.cfg["complete_limit"])
 
     @pynvim.command(
-        "DWNedit", nargs=1, complete="customlist,DWNcompletePages", sync=True
+        "DWNedit", nargs=1, complete="customlist,DWNcompleteIndex", sync=True
     )
     def dwn_edit(self, args):
         if not self.dwn_init():
@@ -263,17 +632,24 @@ class DokuVimNG:
             self.close(wp)
 
         if wp not in self.buffers:
-            perm = int(self.xmlrpc.pages.permission(wp))
+            pending = None if rev else self.save_queue.get(wp)
+            try:
+                perm, text, locked = self.fetch_page(wp, rev=rev, lock=True)
+            except dokuwiki.DokuWikiError as err:
+                self._nvim.err_write("{}\n".format(err))
+                return
+            except Exception:
+                # pages with queued saves can be edited while offline
+                if pending is None:
+                    raise
+                entry = self.page_cache.get(wp)
+                perm = entry["perm"] if entry is not None else 2
+                locked = True
 
-            if perm >= 1:
-                try:
-                    if rev:
-                        text = self.xmlrpc.pages.get(wp, int(rev))
-                    else:
-                        text = self.xmlrpc.pages.get(wp)
-                except dokuwiki.DokuWikiError as err:
-                    self._nvim.err_write("\n".format(err))
+            if pending is not None:
+                text = pending["text"]
 
+            if perm >= 1:
                 if text:
                     if perm == 1:
                         self._nvim.err_write(
@@ -281,35 +657,48 @@ class DokuVimNG:
                                 wp
                             )
                         )
-                        self.buffers[wp] = Buffer(self._nvim, wp, "nowrite", True)
-                        self.buffers[wp].page[:] = text.split("\n")
-                        self.buffers[wp].buf[:] = self.buffers[wp].page
-                        self._nvim.command("setlocal nomodifiable")
-                        self._nvim.command("setlocal readonly")
+                        self.buffers[wp] = Buffer(
+                            self._nvim, self.wiki.prefix + wp, "nowrite", True
+                        )
+                        with Batch(self._nvim) as batch:
+                            batch.set_lines(self.buffers[wp].buf, text.split("\n"))
+                            batch.command("setlocal nomodifiable")
+                            batch.command("setlocal readonly")
+                            tick = batch.changedtick(self.buffers[wp].buf)
+                        self.buffers[wp].saved(text, batch.results[tick])
 
                     if perm >= 2:
-                        if not self.lock(wp):
+                        if not locked:
+                            self._nvim.err_write("unable to lock page {}\n".format(wp))
                             return
 
                         self._nvim.out_write("Opening {} for editing ...\n".format(wp))
-                        self.buffers[wp] = Buffer(self._nvim, wp, "acwrite", True)
-                        self.buffers[wp].page[:] = text.split("\n")
-                        self.buffers[wp].buf[:] = self.buffers[wp].page
-
-                        self._nvim.command("set nomodified")
-                        self._nvim.command("autocmd! BufWriteCmd <buffer> DWNsave")
-                        self._nvim.command("autocmd! FileWriteCmd <buffer> DWNsave")
-                        self._nvim.command("autocmd! FileAppendCmd <buffer> DWNsave")
+                        self.buffers[wp] = Buffer(
+                            self._nvim, self.wiki.prefix + wp, "acwrite", True
+                        )
+                        with Batch(self._nvim) as batch:
+                            batch.set_lines(self.buffers[wp].buf, text.split("\n"))
+                            batch.command("set nomodified")
+                            batch.command("autocmd! BufWriteCmd <buffer> DWNsave")
+                            batch.command("autocmd! FileWriteCmd <buffer> DWNsave")
+                            batch.command("autocmd! FileAppendCmd <buffer> DWNsave")
+                            tick = batch.changedtick(self.buffers[wp].buf)
+                        self.buffers[wp].saved(text, batch.results[tick])
 
                 if not text and perm >= 4:
                     self._nvim.out_write("Creating new page: {}\n".format(wp))
-                    self.buffers[wp] = Buffer(self._nvim, wp, "acwrite", True)
+                    self.buffers[wp] = Buffer(
+                        self._nvim, self.wiki.prefix + wp, "acwrite", True
+                    )
                     self.needs_refresh = True
 
-                    self._nvim.command("set nomodified")
-                    self._nvim.command("autocmd! BufWriteCmd <buffer> DWNsave")
-                    self._nvim.command("autocmd! FileWriteCmd <buffer> DWNsave")
-                    self._nvim.command("autocmd! FileAppendCmd <buffer> DWNsave")
+                    with Batch(self._nvim) as batch:
+                        batch.command("set nomodified")
+                        batch.command("autocmd! BufWriteCmd <buffer> DWNsave")
+                        batch.command("autocmd! FileWriteCmd <buffer> DWNsave")
+                        batch.command("autocmd! FileAppendCmd <buffer> DWNsave")
+                        tick = batch.changedtick(self.buffers[wp].buf)
+                    self.buffers[wp].saved("", batch.results[tick])
 
                 self.switch_to_page_ns(wp)
                 self._nvim.command(
@@ -327,6 +716,290 @@ class DokuVimNG:
             self.needs_refresh = False
             self._nvim.command("silent! buffer! {}".format(self.buffers[wp].num))
 
+    def fetch_page(self, wp, xmlrpc=None, rev="", lock=False):
+        """
+        Returns the permission level and the content of a wiki page and
+        whether the page could be locked, if requested. Independent calls are
+        sent as a single multicall. Pages in the page cache are only fetched
+        again if they changed on the remote wiki, which isn't checked at all
+        within the configured ttl.
+        """
+
+        if xmlrpc is None:
+            xmlrpc = self.xmlrpc
+
+        calls = MultiCall(xmlrpc)
+        if lock:
+            locks = calls.add("dokuwiki.setLocks", lock=[wp], unlock=[])
+
+        entry = None if rev else self.page_cache.get(wp)
+        fresh = entry is not None and (
+            time.time() - entry["checked"] < self.cfg["page_cache_ttl"]
+        )
+        if not fresh and not rev:
+            info = calls.add("wiki.getPageInfo", wp)
+        if entry is None:
+            perm = calls.add("wiki.aclCheck", wp)
+            if rev:
+                text = calls.add("wiki.getPageVersion", wp, int(rev))
+            else:
+                text = calls.add("wiki.getPage", wp)
+        calls.run()
+
+        locked = False
+        if lock:
+            result = calls.results[locks]
+            locked = isinstance(result, dict) and wp in result.get("locked", [])
+
+        if fresh:
+            locked = self.keep_lock(xmlrpc, wp, entry["perm"], entry["text"], locked)
+            return entry["perm"], entry["text"], locked
+
+        if not rev:
+            info = calls.result(info)
+
+        if entry is not None:
+            if info and info["version"] == entry["version"]:
+                self.page_cache.touch(wp)
+                locked = self.keep_lock(
+                    xmlrpc, wp, entry["perm"], entry["text"], locked
+                )
+                return entry["perm"], entry["text"], locked
+
+            calls = MultiCall(xmlrpc)
+            perm = calls.add("wiki.aclCheck", wp)
+            text = calls.add("wiki.getPage", wp)
+            calls.run()
+
+        perm = int(calls.result(perm))
+        if perm < 1:
+            return perm, "", self.keep_lock(xmlrpc, wp, perm, "", locked)
+
+        text = calls.result(text)
+        if text and not rev:
+            self.page_fetched(wp, text, info.get("version") if info else None, perm)
+        return perm, text, self.keep_lock(xmlrpc, wp, perm, text, locked)
+
+    def keep_lock(self, xmlrpc, wp, perm, text, locked):
+        """
+        Returns whether a page locked together with fetching it stays locked.
+        The lock is requested before the permission is known, only existing
+        pages which may be edited are kept locked like edit() expects.
+        """
+
+        if not locked or (text and perm >= 2):
+            return locked
+
+        try:
+            xmlrpc.send("dokuwiki.setLocks", lock=[], unlock=[wp])
+        except dokuwiki.DokuWikiError:
+            pass
+        return False
+
+    def page_fetched(self, wp, text, version, perm):
+        """
+        Stores the fetched content of a page in the local caches. Also called
+        from worker threads.
+        """
+
+        self.page_cache.put(wp, text, version, perm)
+        self.index_text(wp, text, version)
+
+    def page_removed(self, wp):
+        self.page_cache.discard(wp)
+        self.unindex_text(wp)
+
+    def index_text(self, wp, text, version=None):
+        """
+        Adds the content of a page to the full text index and the link graph.
+        """
+
+        self.fulltext.add(wp, text, version)
+        self.links.add(wp, text)
+
+    def unindex_text(self, wp):
+        self.fulltext.remove(wp)
+        self.links.remove(wp)
+
+    def load_fulltext(self):
+        """
+        Loads the full text index from disk and builds the link graph from its
+        pages. Runs on its own thread.
+        """
+
+        self.fulltext.load()
+        with self.fulltext.lock:
+            pages = list(self.fulltext.docs)
+        for wp in pages:
+            text = self.fulltext.text(wp)
+            if text is not None and wp in self.fulltext:
+                self.links.add(wp, text, replace=False)
+
+    def apply_changes(self, changes):
+        """
+        Drops cached contents of pages changed on the remote wiki and fetches
+        their new contents into the full text index in the background, pages
+        created on the remote wiki are added to it.
+        """
+
+        stale = []
+        for change in changes:
+            wp = change["name"]
+            if not change.get("size"):
+                self.page_removed(wp)
+                continue
+
+            entry = self.page_cache.get(wp)
+            if entry is not None and entry["version"] != change["version"]:
+                self.page_cache.discard(wp)
+
+            if self.fulltext.version(wp) != change["version"]:
+                stale.append(wp)
+
+        if stale:
+            self.submit(self.prefetcher, self.index_pages, stale)
+
+    def index_pages(self, pages, save=True):
+        """
+        Fetches the contents of the given pages into the full text index.
+        Runs on a worker thread. A save of the index is scheduled afterwards
+        unless save is False.
+        """
+
+        try:
+            xmlrpc = self.client()
+            for i in range(0, len(pages), 50):
+                calls = MultiCall(xmlrpc)
+                chunk = [
+                    (
+                        wp,
+                        calls.add("wiki.getPageInfo", wp),
+                        calls.add("wiki.getPage", wp),
+                    )
+                    for wp in pages[i : i + 50]
+                ]
+                calls.run()
+
+                for wp, info, text in chunk:
+                    info = calls.results[info]
+                    text = calls.results[text]
+                    if not isinstance(text, str):
+                        continue
+                    if text:
+                        version = (
+                            info.get("version") if isinstance(info, dict) else None
+                        )
+                        self.index_text(wp, text, version)
+                    else:
+                        self.unindex_text(wp)
+        except Exception:
+            # the pages are fetched again with the next change or DWNgrep!
+            pass
+
+        if save:
+            self.fulltext.save_later()
+
+    def build_fulltext(self):
+        """
+        Fetches all pages missing in the full text index in the background.
+        """
+
+        pages = [wp for wp in self.page_index.pages if wp not in self.fulltext]
+        if not pages:
+            return
+
+        self.set_status("search", " indexing {} pages…".format(len(pages)))
+        futures = [
+            self.submit(self.prefetcher, self.index_pages, pages[i : i + 500], False)
+            for i in range(0, len(pages), 500)
+        ]
+
+        def done():
+            # saving rewrites the whole index, so it is only done once
+            wait(futures)
+            self.fulltext.save()
+            self.async_call(self.set_status, "search")
+
+        threading.Thread(
+            target=self.in_wiki, args=(self.wiki, done), daemon=True
+        ).start()
+
+    @pynvim.command("DWNgrep", nargs="?", bang=True, sync=True)
+    def dwn_grep(self, args, bang):
+        if not self.dwn_init():
+            return
+
+        if bang:
+            self.build_fulltext()
+
+        if len(args) == 1:
+            self.grep(args[0])
+
+    def grep(self, query):
+        """
+        Searches the contents of the pages in the full text index and shows
+        the matching lines.
+        """
+
+        if self.diffmode:
+            self.diff_close()
+
+        self.focus(2)
+
+        result = self.fulltext.search(query)
+        buf = self.buffers["search"].buf
+        with Batch(self._nvim) as batch:
+            batch.command("silent! buffer! {}".format(self.buffers["search"].num))
+            if result:
+                batch.set_option(buf, "modifiable", True)
+                batch.set_lines(
+                    buf,
+                    ["{}\t{}\t{}".format(wp, num, line) for wp, num, line in result],
+                )
+                batch.set_option(buf, "modifiable", False)
+                batch.command("map <silent> <buffer> <enter> :call DWNgrepEdit()<CR>")
+
+        if not result:
+            self._nvim.err_write("DokuVimNG Error: No matching lines found!\n")
+
+    @pynvim.function("DWNgrepEdit", sync=True)
+    def grep_edit(self, args=None):
+        if not self.dwn_init():
+            return
+
+        """
+        Special mapping for opening the page of a match at the matching line.
+        """
+
+        row, col = self._nvim.current.window.cursor
+        wp, num = self._nvim.current.buffer[row - 1].split("\t")[:2]
+        self.edit(wp)
+        self._nvim.current.window.cursor = (int(num), 0)
+
+    def prefetch(self, ns):
+        """
+        Fetches the pages of a namespace shown in the index window into the
+        page cache in the background.
+        """
+
+        for future in self.prefetching:
+            future.cancel()
+
+        _, pages = self.page_index.tree.listing(ns)
+        pages = pages[: self._nvim.current.window.height]
+        self.prefetching = [
+            self.submit(self.prefetcher, self.prefetch_page, ns + page)
+            for page in pages
+            if ns + page not in self.buffers
+        ]
+
+    def prefetch_page(self, wp):
+        try:
+            self.fetch_page(wp, self.client())
+        except Exception:
+            # prefetching is best effort, edit() reports any errors
+            pass
+
     def diff(self, revline):
         """
         Opens a page and a given revision in diff mode.
@@ -340,41 +1013,57 @@ class DokuVimNG:
         if wp not in self.buffers:
             self.edit(wp)
 
-        if rev not in self.buffers[wp].diff:
-            text = self.xmlrpc.pages.get(wp, int(rev))
-            if text:
-                self.buffers[wp].diff[rev] = Buffer(
-                    self._nvim, wp + "_" + date, "nofile"
-                )
-                self.buffers[wp].diff[rev].page[:] = text.split("\n")
-            else:
-                self._nvim.out_write("Error, couldn't load revision for diffing.\n")
-                return
+        text = self.revision(wp, rev)
+        if not text:
+            self._nvim.out_write("Error, couldn't load revision for diffing.\n")
+            return
+
+        self.diff_buffer = Buffer(
+            self._nvim, self.wiki.prefix + wp + "_" + date, "nofile"
+        )
+        with Batch(self._nvim) as batch:
+            batch.set_option(self.diff_buffer.buf, "modifiable", True)
+            batch.set_lines(self.diff_buffer.buf, text.split("\n"))
+            batch.set_option(self.diff_buffer.buf, "modifiable", False)
 
         self.focus(2)
         self._nvim.command("silent! buffer! {}".format(self.buffers[wp].num))
         self._nvim.command("vertical diffsplit")
         self.focus(3)
-        self._nvim.command("silent! buffer! {}".format(self.buffers[wp].diff[rev].num))
-        self._nvim.command("setlocal modifiable")
+        self._nvim.command("silent! buffer! {}".format(self.diff_buffer.num))
         self._nvim.command("abbr <buffer> close DWdiffclose")
         self._nvim.command("abbr <buffer> DWclose DWdiffclose")
-        self.buffers[wp].diff[rev].buf[:] = self.buffers[wp].diff[rev].page
-        self._nvim.command("setlocal nomodifiable")
         self.buffer_setup()
         self._nvim.command("diffthis")
         self.focus(2)
         self.diffmode = True
 
+    def revision(self, wp, rev):
+        """
+        Returns the content of an old revision of a page, from the revision
+        cache if it was fetched before.
+        """
+
+        text = self.revision_cache.get(wp, rev)
+        if text is None:
+            text = self.xmlrpc.pages.get(wp, int(rev))
+            if text:
+                self.revision_cache.put(wp, rev, text)
+        return text
+
     @pynvim.command("DWNdiffClose", nargs=0, sync=True)
     def diff_close(self):
         """
-        Closes the diff window.
+        Closes the diff window and wipes the revision buffer, it is recreated
+        from the revision cache when needed again.
         """
 
         self.focus(3)
         self._nvim.command("diffoff")
         self._nvim.command("close")
+        if self.diff_buffer is not None:
+            self._nvim.command("silent! bwipeout! {}".format(self.diff_buffer.num))
+            self.diff_buffer = None
         self.diffmode = False
         self.focus(2)
         self._nvim.command("vertical resize")
@@ -410,10 +1099,12 @@ class DokuVimNG:
                     "Error: Current buffer {} is readonly!\n".format(wp)
                 )
             else:
-                text = "\n".join(self.buffers[wp].buf)
-                if text and not self.ismodified(wp):
+                lines = self.buffers[wp].buf[:]
+                modified = self.ismodified(wp, lines)
+                text = "\n".join(lines)
+                if text and not modified:
                     self._nvim.out_write("No unsaved changes in current buffer.\n")
-                elif not text and wp not in self.pages:
+                elif not text and wp not in self.page_index:
                     self._nvim.out_write("Can't save new empty page {}.\n".format(wp))
                 else:
                     if not sum and text:
@@ -421,34 +1112,161 @@ class DokuVimNG:
                         minor = 1
 
                     try:
-                        self.xmlrpc.pages.set(wp, text, sum=sum, minor=minor)
-                        self.buffers[wp].page[:] = self.buffers[wp].buf
-                        self.buffers[wp].need_save = False
+                        if self.cfg["async_save"]:
+                            self.save_queue.put(wp, text, sum, minor)
+                            self.flush_queue()
+                            written = "queued"
+                        else:
+                            self.xmlrpc.pages.set(wp, text, sum=sum, minor=minor)
+                            written = "written"
 
                         if text:
-                            self._nvim.command(
-                                "silent! buffer! {}".format(self.buffers[wp].num)
-                            )
-                            self._nvim.command("set nomodified")
-                            self._nvim.out_write("Page {} written!\n".format(wp))
+                            self.page_cache.update(wp, text)
+                            self.index_text(wp, text)
+                            with Batch(self._nvim) as batch:
+                                batch.command(
+                                    "silent! buffer! {}".format(self.buffers[wp].num)
+                                )
+                                batch.command("set nomodified")
+                                tick = batch.changedtick(self.buffers[wp].buf)
+                                batch.request(
+                                    "nvim_out_write",
+                                    "Page {} {}!\n".format(wp, written),
+                                )
+                            self.buffers[wp].saved(text, batch.results[tick])
 
                             if self.needs_refresh:
-                                self.index(self.cur_ns, True)
+                                self.update_index(pages=[wp])
                                 self.needs_refresh = False
-                                self.focus(2)
                         else:
-                            self._nvim.out_write("Page {} removed!\n".format(wp))
+                            self._nvim.out_write(
+                                "Page {} {}!\n".format(
+                                    wp, "removed" if written == "written" else written
+                                )
+                            )
+                            self.page_removed(wp)
+                            # the empty buffer is what the wiki has now
+                            self.buffers[wp].saved(text, None)
                             self.close(wp)
-                            self.index(self.cur_ns, True)
-                            self.focus(2)
+                            self.update_index(pages=[wp], removed=True)
 
-                    except dokuwiki.DokuWikiError as err:
+                    except (dokuwiki.DokuWikiError, OSError) as err:
                         self._nvim.err_write("DokuVimKi Error: {}\n".format(err))
         except KeyError as err:
             self._nvim.err_write(
                 "Error: Current buffer {} is not handled by DWsave!\n".format(wp)
             )
 
+    def flush_queue(self):
+        """
+        Starts writing the queued saves to the wiki in the background.
+        """
+
+        try:
+            self.submit(self.saver, self.flush_worker)
+        except RuntimeError:
+            # the interpreter is shutting down, the journal keeps the saves
+            pass
+
+    def flush_worker(self):
+        """
+        Writes the queued saves in queue order. Runs on the save worker. Saves
+        the wiki rejects are kept in the queue but not retried, on connection
+        errors the queue is flushed again after save_retry seconds.
+        """
+
+        for wp, entry in self.save_queue.pending():
+            try:
+                self.client().pages.set(
+                    wp, entry["text"], sum=entry["sum"], minor=entry["minor"]
+                )
+            except dokuwiki.DokuWikiError as err:
+                self.save_queue.failed(wp, entry["seq"], str(err))
+                self.async_call(self.save_failed, wp, err)
+                continue
+            except Exception as err:
+                self.async_call(self.save_failed, wp, err, True)
+                if self.save_retry is None or not self.save_retry.is_alive():
+                    self.save_retry = threading.Timer(
+                        self.cfg["save_retry"],
+                        self.in_wiki,
+                        (self.wiki, self.flush_queue),
+                    )
+                    self.save_retry.daemon = True
+                    self.save_retry.start()
+                return
+
+            self.save_queue.done(wp, entry["seq"])
+            self.async_call(self.save_written, wp, entry["text"])
+
+    def save_written(self, wp, text):
+        if self.offline:
+            self.offline = False
+            self._nvim.out_write("Connection to the wiki is back.\n")
+
+        if text:
+            self.page_cache.update(wp, text)
+            self.index_text(wp, text)
+        self.set_status("queue", " {} queued".format(len(self.save_queue)))
+
+    def save_failed(self, wp, err, retry=False):
+        if not retry:
+            self._nvim.err_write(
+                "DokuVimNG Error: Saving {} failed: {}\n".format(wp, err)
+            )
+        elif not self.offline:
+            self.offline = True
+            self._nvim.err_write(
+                "DokuVimNG Error: Saving {} failed: {}. Retrying every {}s.\n".format(
+                    wp, err, self.cfg["save_retry"]
+                )
+            )
+        self.set_status("queue", " {} queued".format(len(self.save_queue)))
+
+    @pynvim.command("DWNqueue", nargs="*", sync=True)
+    def dwn_queue(self, args):
+        if not self.dwn_init():
+            return
+
+        if args and args[0] == "flush":
+            self.save_queue.retry()
+            self.flush_queue()
+        elif len(args) == 2 and args[0] == "discard":
+            self.save_queue.discard(args[1])
+
+        self.show_queue()
+
+    def show_queue(self):
+        """
+        Shows the saves waiting to be written to the wiki.
+        """
+
+        if self.diffmode:
+            self.diff_close()
+
+        self.focus(2)
+
+        lines = []
+        for wp, entry in self.save_queue.items():
+            lines.append(
+                "{}\t{}\t{}\t{}".format(
+                    wp,
+                    time.strftime("%Y/%m/%d %H:%M:%S", time.localtime(entry["time"])),
+                    entry["sum"] if entry["text"] else "(delete)",
+                    entry["error"] or "",
+                )
+            )
+
+        buf = self.buffers["queue"].buf
+        with Batch(self._nvim) as batch:
+            batch.command("silent! buffer! {}".format(self.buffers["queue"].num))
+            batch.command("setlocal nowrap")
+            batch.set_option(buf, "modifiable", True)
+            batch.set_lines(buf, lines)
+            batch.set_option(buf, "modifiable", False)
+            batch.command("map <silent> <buffer> <enter> :call DWNlinkEdit()<CR>")
+            self.set_status("queue", " {} queued".format(len(lines)), batch)
+
     def upload(self, file, overwrite=False):
         """
         Uploads a file to the remote wiki.
@@ -459,24 +1277,70 @@ class DokuVimNG:
 
         if os.path.isfile(path):
             try:
-                fh = open(path, "rb")
-                data = fh.read()
-                file_id = self.cur_ns + fname
-                try:
-                    self.xmlrpc.medias.set(file_id, data, overwrite)
-                    self._nvim.out_write("Uploaded {} successfully.\n".format(fname))
-                    self.refresh()
-                    return True
-                except dokuwiki.DokuWikiError as err:
-                    self._nvim.err_write("{}\n".format(err))
-                    return False
+                with open(path, "rb") as fh:
+                    data = fh.read()
             except (IOError, Exception) as err:
                 self._nvim.err_write("{}\n".format(err))
                 return False
+
+            file_id = self.cur_ns + fname
+            if (
+                self.cfg["media_dedup"]
+                and self.find_media(data, self.cur_ns) == file_id
+            ):
+                self._nvim.out_write("{} is up to date.\n".format(fname))
+                return True
+            return self.upload_data(file_id, data, overwrite)
         else:
             self._nvim.err_write("{} is not a file\n".format(path))
             return False
 
+    def upload_data(self, file_id, data, overwrite=False):
+        """
+        Uploads in memory data as media file to the remote wiki.
+        """
+
+        try:
+            self.xmlrpc.medias.set(file_id, data, overwrite)
+            self.media_hashes.add(file_id, hashlib.md5(data).hexdigest(), len(data))
+            self.media_hashes.save()
+            self._nvim.out_write(
+                "Uploaded {} successfully.\n".format(file_id.rsplit(":", 1)[-1])
+            )
+            self.update_index(media=[file_id])
+            return True
+        except (dokuwiki.DokuWikiError, Exception) as err:
+            self._nvim.err_write("{}\n".format(err))
+            return False
+
+    def find_media(self, data, ns):
+        """
+        Returns the id of an existing media file with the same content as
+        data, preferably one in namespace ns, or None. Unless a local hash
+        matches, the hashes of the media files in ns are fetched.
+        """
+
+        digest = hashlib.md5(data).hexdigest()
+        found = [
+            media_id
+            for media_id in self.media_hashes.find(digest)
+            if media_id in self.page_index.media_set
+        ]
+
+        if not found:
+            try:
+                listing = self.xmlrpc.medias.list(ns.rstrip(":"), depth=1, hash=True)
+            except dokuwiki.DokuWikiError:
+                listing = []
+            self.media_hashes.update(listing or [])
+            self.media_hashes.save()
+            found = [item["id"] for item in listing or [] if item.get("hash") == digest]
+
+        local = [
+            media_id for media_id in found if media_id[: media_id.rfind(":") + 1] == ns
+        ]
+        return (local or found or [None])[0]
+
     @pynvim.command("DWNpasteImage", nargs="*", sync=True)
     def dwn_paste_image(self, args):
         if len(args) > 3:
@@ -499,48 +1363,75 @@ class DokuVimNG:
         self.paste_image(link=link, after=after, silent=silent)
 
     def paste_image(self, link=False, after=False, silent=False):
+        from PIL import ImageGrab
+
+        from DokuVimNG.images import encode
+
         img = ImageGrab.grabclipboard()
         if img is None:
             return
 
-        with TemporaryDirectory() as tmpdir:
-            img_name = ""
-            if not silent:
-                img_name = self._nvim.exec_lua("return vim.fn.input('File Name? ', '')")
-                img_name = os.path.basename(img_name)
-            if img_name == "":
-                timestamp = int(time.time())
-                img_name = f"image_{timestamp}"
-
-            img_path = os.path.abspath(os.path.join(tmpdir, f"{img_name}.png"))
-            img.save(img_path, "PNG")
-
-            img_ns = self.cur_ns
-            if self.img_sub_ns:
-                img_ns = f"{img_ns}{self.img_sub_ns}:"
-
-            old_ns = self.cur_ns
-            self.cur_ns = img_ns
-            if not self.upload(img_path, True):
-                self.cur_ns = old_ns
+        try:
+            data, ext = encode(
+                img,
+                self.cfg["image_format"],
+                self.cfg["image_max_width"],
+                self.cfg["image_max_height"],
+                self.cfg["image_quality"],
+                self.cfg["image_optimize"],
+                self.cfg["image_max_bytes"],
+            )
+        except (ValueError, OSError) as err:
+            self._nvim.err_write("DokuVimNG Error: {}\n".format(err))
+            return
+
+        img_ns = self.cur_ns
+        if self.img_sub_ns:
+            img_ns = f"{img_ns}{self.img_sub_ns}:"
+
+        img_url = None
+        if self.cfg["media_dedup"]:
+            img_url = self.find_media(data, img_ns)
+            if img_url is not None:
+                self._nvim.out_write("Image exists already as {}.\n".format(img_url))
+
+        if img_url is None:
+            img_url = self.upload_image(img_ns, data, ext, silent)
+            if img_url is None:
                 return
-            self.cur_ns = old_ns
 
-            img_url = f"{img_ns}{img_name}.png"
-            pattern = img_url
-            if link:
-                pattern = "{{" + img_url + "}}"
+        pattern = img_url
+        if link:
+            pattern = "{{" + img_url + "}}"
 
-            if self._nvim.eval("mode()") in ["v", "V"]:
-                self._nvim.command(f"normal! c{pattern}")
+        if self._nvim.eval("mode()") in ["v", "V"]:
+            self._nvim.command(f"normal! c{pattern}")
+        else:
+            if after:
+                self._nvim.command(f"normal! a{pattern}")
             else:
-                if after:
-                    self._nvim.command(f"normal! a{pattern}")
-                else:
-                    self._nvim.command(f"normal! i{pattern}")
+                self._nvim.command(f"normal! i{pattern}")
+
+    def upload_image(self, img_ns, data, ext, silent=False):
+        """
+        Uploads encoded image data under a name asked for unless silent and
+        returns its media id or None.
+        """
 
-    # TODO: compl func for namespaces only
-    @pynvim.command("DWNcd", nargs="?", complete="customlist,DWNcompletePages")
+        img_name = ""
+        if not silent:
+            img_name = self._nvim.exec_lua("return vim.fn.input('File Name? ', '')")
+            img_name = os.path.basename(img_name)
+        if img_name == "":
+            timestamp = int(time.time())
+            img_name = f"image_{timestamp}"
+
+        img_url = f"{img_ns}{img_name}.{ext}"
+        if not self.upload_data(img_url, data, True):
+            return None
+        return img_url
+
+    @pynvim.command("DWNcd", nargs="?", complete="customlist,DWNcompleteNamespaces")
     def dwn_cd(self, args):
         if len(args) == 1:
             self.cd(args[0])
@@ -562,36 +1453,33 @@ class DokuVimNG:
         if not self.dwn_init():
             return
 
-        self.index("", args[0])
+        self.index("", args[0], full=True)
 
-    def index(self, query="", refresh=False):
+    def index(self, query="", refresh=False, full=False):
         """
         Build the index used to navigate the remote wiki.
         """
 
-        index = []
-        pages = []
-        dirs = []
-
         self.focus(1)
-        self._nvim.command("set winwidth={}".format(self.index_winwith))
-        self._nvim.command("set winminwidth={}".format(self.index_winwith))
 
-        self._nvim.command("silent! buffer! {}".format(self.buffers["index"].num))
-        self._nvim.command("setlocal modifiable")
-        self._nvim.command("setlocal nonumber")
-        self._nvim.command(r"syn match DokuVimKi_NS /^.*\//")
-        self._nvim.command("syn match DokuVimKi_CURNS /^ns:/")
+        with Batch(self._nvim) as batch:
+            batch.command("set winwidth={}".format(self.index_winwith))
+            batch.command("set winminwidth={}".format(self.index_winwith))
 
-        self._nvim.command(
-            "hi DokuVimKi_NS term=bold cterm=bold ctermfg=LightBlue gui=bold guifg=LightBlue"
-        )
-        self._nvim.command(
-            "hi DokuVimKi_CURNS term=bold cterm=bold ctermfg=Yellow gui=bold guifg=Yellow"
-        )
+            batch.command("silent! buffer! {}".format(self.buffers["index"].num))
+            batch.command("setlocal nonumber")
+            batch.command(r"syn match DokuVimKi_NS /^.*\//")
+            batch.command("syn match DokuVimKi_CURNS /^ns:/")
+
+            batch.command(
+                "hi DokuVimKi_NS term=bold cterm=bold ctermfg=LightBlue gui=bold guifg=LightBlue"
+            )
+            batch.command(
+                "hi DokuVimKi_CURNS term=bold cterm=bold ctermfg=Yellow gui=bold guifg=Yellow"
+            )
 
         if refresh:
-            self.refresh()
+            self.refresh(full)
 
         if query and query[-1] != ":":
             self.edit(query)
@@ -599,48 +1487,41 @@ class DokuVimNG:
         else:
             self.cur_ns = query
 
-        if self.pages:
-            for page in self.pages:
-                if not query:
-                    if ":" not in page:
-                        pages.append(page)
-                    else:
-                        ns = page.split(":", 1)[0] + "/"
-                        if ns not in dirs:
-                            dirs.append(ns)
-                else:
-                    if re.search("^" + query, page):
-                        page = page.replace(query, "")
-                        if page.find(":") == -1:
-                            if page not in index:
-                                pages.append(page)
-                        else:
-                            ns = page.split(":", 1)[0] + "/"
-                            if ns not in dirs:
-                                dirs.append(ns)
+        with Batch(self._nvim) as batch:
+            self.render_index(batch)
 
-            index.append("ns: " + self.cur_ns)
+            batch.command('map <silent> <buffer> <enter> :call DWNcmd("index")<CR>')
+            batch.command('map <silent> <buffer> r :call DWNcmd("revisions")<CR>')
+            batch.command('map <silent> <buffer> b :call DWNcmd("backlinks")<CR>')
+            batch.command('map <silent> <buffer> R :call DWNindex("True")<CR>')
+            batch.command("2")
 
-            if query:
-                index.append(".. (up a namespace)")
+        if self.cfg["prefetch"]:
+            self.prefetch(self.cur_ns)
 
-            index.append("")
+    def render_index(self, batch):
+        """
+        Writes the listing of the current namespace into the index buffer
+        without touching the window layout.
+        """
 
-            pages.sort()
-            dirs.sort()
-            index = index + dirs + pages
+        dirs, pages = self.page_index.tree.listing(self.cur_ns)
+        if len(self.page_index) and self.init_start is not None:
+            self.startup.record("first index", time.perf_counter() - self.init_start)
 
-            self.buffers["index"].buf[:] = index
+        index = ["ns: " + self.cur_ns]
 
-            self._nvim.command(
-                'map <silent> <buffer> <enter> :call DWNcmd("index")<CR>'
-            )
-            self._nvim.command('map <silent> <buffer> r :call DWNcmd("revisions")<CR>')
-            self._nvim.command('map <silent> <buffer> b :call DWNcmd("backlinks")<CR>')
-            self._nvim.command('map <silent> <buffer> R :call DWNindex("True")<CR>')
+        if self.cur_ns:
+            index.append(".. (up a namespace)")
 
-            self._nvim.command("setlocal nomodifiable")
-            self._nvim.command("2")
+        index.append("")
+
+        index = index + [ns + "/" for ns in dirs] + pages
+
+        buf = self.buffers["index"].buf
+        batch.set_option(buf, "modifiable", True)
+        batch.set_lines(buf, index)
+        batch.set_option(buf, "modifiable", False)
 
     @pynvim.command("DWNchanges", nargs="?")
     def dwn_changes(self, args):
@@ -659,8 +1540,9 @@ class DokuVimNG:
 
         self.focus(2)
 
-        self._nvim.command("silent! buffer! {}".format(self.buffers["changes"].num))
-        self._nvim.command("setlocal modifiable")
+        with Batch(self._nvim) as batch:
+            batch.command("silent! buffer! {}".format(self.buffers["changes"].num))
+            batch.command("setlocal modifiable")
 
         if not timeframe:
             timestamp = int(time.time()) - (60 * 60 * 24 * 7)
@@ -685,27 +1567,51 @@ class DokuVimNG:
                 return
 
         try:
-            changes = self.xmlrpc.pages.changes(timestamp)
+            incremental = self.change_log.covers(timestamp)
+            new = self.fetch_changes(timestamp)
+            buf = self.buffers["changes"].buf
+
+            # only the new changes are added to a listing of the same timeframe
+            view = self.changes_view
+            if incremental and view is not None and view[0] == timeframe:
+                fmt = view[1]
+                with Batch(self._nvim) as batch:
+                    if new:
+                        batch.request(
+                            "nvim_buf_set_lines",
+                            buf,
+                            0,
+                            0,
+                            True,
+                            [fmt.format(**change) for change in reversed(new)],
+                        )
+                    batch.command("setlocal nomodifiable")
+                return
+
+            changes = self.change_log.query(timestamp)
             if len(changes) > 0:
                 maxlen = max(len(change["name"]) for change in changes)
                 fmt = "{name:" + str(maxlen) + "}\t{lastModified}\t{version}\t{author}"
-                self.buffers["changes"].buf[:] = list(
-                    reversed([fmt.format(**change) for change in changes])
-                )
-                self._nvim.command(r"syn match DokuVimKi_REV_PAGE /^\(\w\|:\)*/")
-                self._nvim.command(r"syn match DokuVimKi_REV_TS /\s\d*\s/")
+                self.changes_view = (timeframe, fmt)
+                with Batch(self._nvim) as batch:
+                    batch.set_lines(
+                        buf,
+                        [fmt.format(**change) for change in reversed(changes)],
+                    )
+                    batch.command(r"syn match DokuVimKi_REV_PAGE /^\(\w\|:\)*/")
+                    batch.command(r"syn match DokuVimKi_REV_TS /\s\d*\s/")
 
-                self._nvim.command(
-                    "hi DokuVimKi_REV_PAGE cterm=bold ctermfg=Yellow gui=bold guifg=Yellow"
-                )
-                self._nvim.command(
-                    "hi DokuVimKi_REV_TS cterm=bold ctermfg=Yellow gui=bold guifg=Yellow"
-                )
+                    batch.command(
+                        "hi DokuVimKi_REV_PAGE cterm=bold ctermfg=Yellow gui=bold guifg=Yellow"
+                    )
+                    batch.command(
+                        "hi DokuVimKi_REV_TS cterm=bold ctermfg=Yellow gui=bold guifg=Yellow"
+                    )
 
-                self._nvim.command("setlocal nomodifiable")
-                self._nvim.command(
-                    "map <silent> <buffer> <enter> :call DWNrevEdit()<CR>"
-                )
+                    batch.command("setlocal nomodifiable")
+                    batch.command(
+                        "map <silent> <buffer> <enter> :call DWNrevEdit()<CR>"
+                    )
 
             else:
                 print("DokuVimKi Error: No changes", file=sys.stderr)
@@ -713,6 +1619,28 @@ class DokuVimNG:
         except dokuwiki.DokuWikiError as err:
             self._nvim.err_write("\n".format(err))
 
+    def fetch_changes(self, timestamp):
+        """
+        Updates the local change log and returns the new changes. Only the
+        changes after the last fetch are requested unless the log doesn't
+        reach back to timestamp yet.
+        """
+
+        since = timestamp
+        if self.change_log.covers(timestamp):
+            since = self.change_log.until
+
+        calls = MultiCall(self.xmlrpc)
+        now = calls.add("dokuwiki.getTime")
+        changes = calls.add("wiki.getRecentChanges", since)
+        calls.run()
+
+        changes = calls.result(changes) or []
+        new = self.change_log.add(changes, since, int(calls.result(now)))
+        self.change_log.save()
+        self.apply_changes(changes)
+        return new
+
     @pynvim.command(
         "DWNrevisions", nargs="*", complete="customlist,DWNcompletePages", sync=True
     )
@@ -748,51 +1676,124 @@ class DokuVimNG:
         try:
             self.focus(2)
 
-            self._nvim.command(
-                "silent! buffer! {}".format(self.buffers["revisions"].num)
-            )
-            self._nvim.command("setlocal modifiable")
+            with Batch(self._nvim) as batch:
+                batch.command(
+                    "silent! buffer! {}".format(self.buffers["revisions"].num)
+                )
+                batch.command("setlocal modifiable")
 
             revs = self.xmlrpc.pages.versions(wp, int(first))
             if revs:
-                self.buffers["revisions"].buf[:] = [
-                    wp
-                    + "\t"
-                    + "\t".join(
-                        str(rev[x])
-                        for x in ["modified", "version", "ip", "type", "user", "sum"]
+                self.history = {
+                    "wp": wp,
+                    "offset": int(first) + len(revs),
+                    "loading": False,
+                    "done": False,
+                }
+                with Batch(self._nvim) as batch:
+                    batch.set_lines(
+                        self.buffers["revisions"].buf, self.revision_lines(wp, revs)
+                    )
+                    batch.request(
+                        "nvim_out_write", "loaded revisions for :{}\n".format(wp)
+                    )
+                    batch.command(
+                        "map <silent> <buffer> <enter> :call DWNrevEdit()<CR>"
                     )
-                    for rev in revs
-                ]
-                self._nvim.out_write("loaded revisions for :{}\n".format(wp))
-                self._nvim.command(
-                    "map <silent> <buffer> <enter> :call DWNrevEdit()<CR>"
-                )
 
-                self._nvim.command(r"syn match DokuVimKi_REV_PAGE /^\(\w\|:\)*/")
-                self._nvim.command(r"syn match DokuVimKi_REV_TS /\s\d*\s/")
-                self._nvim.command(r"syn match DokuVimKi_REV_CHANGE /\s\w\{1}\s/")
+                    batch.command(r"syn match DokuVimKi_REV_PAGE /^\(\w\|:\)*/")
+                    batch.command(r"syn match DokuVimKi_REV_TS /\s\d*\s/")
+                    batch.command(r"syn match DokuVimKi_REV_CHANGE /\s\w\{1}\s/")
 
-                self._nvim.command(
-                    "hi DokuVimKi_REV_PAGE term=bold cterm=bold ctermfg=Yellow gui=bold guifg=Yellow"
-                )
-                self._nvim.command(
-                    "hi DokuVimKi_REV_TS term=bold cterm=bold ctermfg=Yellow gui=bold guifg=Yellow"
-                )
-                self._nvim.command(
-                    "hi DokuVimKi_REV_CHANGE term=bold cterm=bold ctermfg=Yellow gui=bold guifg=Yellow"
-                )
+                    batch.command(
+                        "hi DokuVimKi_REV_PAGE term=bold cterm=bold ctermfg=Yellow gui=bold guifg=Yellow"
+                    )
+                    batch.command(
+                        "hi DokuVimKi_REV_TS term=bold cterm=bold ctermfg=Yellow gui=bold guifg=Yellow"
+                    )
+                    batch.command(
+                        "hi DokuVimKi_REV_CHANGE term=bold cterm=bold ctermfg=Yellow gui=bold guifg=Yellow"
+                    )
+
+                    batch.command("setlocal nomodifiable")
+                    batch.command('map <silent> <buffer> d :call DWNcmd("diff")<CR>')
+                    batch.command(
+                        "autocmd! CursorMoved <buffer> "
+                        "if line('.') + winheight(0) >= line('$') "
+                        "| call DWNrevisionsMore() | endif"
+                    )
 
-                self._nvim.command("setlocal nomodifiable")
-                self._nvim.command('map <silent> <buffer> d :call DWNcmd("diff")<CR>')
+                if len(revs) < self._nvim.current.window.height:
+                    self.dwn_revisions_more([])
 
             else:
+                self.history = None
                 self._nvim.err_write(
                     "DokuVimKi Error: No revisions found for page: {}\n".format(wp)
                 )
         except dokuwiki.DokuWikiError as err:
             self._nvim.err_write("DokuVimKi XML-RPC Error: {}\n".format(err))
 
+    def revision_lines(self, wp, revs):
+        return [
+            wp
+            + "\t"
+            + "\t".join(
+                str(rev[x])
+                for x in ["modified", "version", "ip", "type", "user", "sum"]
+            )
+            for rev in revs
+        ]
+
+    @pynvim.function("DWNrevisionsMore")
+    def dwn_revisions_more(self, args):
+        """
+        Fetches the next older revisions of the page shown in the revisions
+        buffer in the background, called when the cursor nears its end.
+        """
+
+        history = self.history
+        if history is None or history["loading"] or history["done"]:
+            return
+
+        history["loading"] = True
+        self.set_status("revisions", " loading…")
+        self.submit(self.worker, self.fetch_revisions, history)
+
+    def fetch_revisions(self, history):
+        try:
+            revs = self.client().pages.versions(history["wp"], history["offset"])
+        except Exception as err:
+            self.async_call(self.append_revisions, history, [], err)
+        else:
+            self.async_call(self.append_revisions, history, revs)
+
+    def append_revisions(self, history, revs, err=None):
+        """
+        Appends fetched revisions to the revisions buffer unless it shows
+        another page by now.
+        """
+
+        history["loading"] = False
+        if history is not self.history:
+            return
+
+        if err is not None or not revs:
+            history["done"] = True
+
+        buf = self.buffers["revisions"].buf
+        with Batch(self._nvim) as batch:
+            self.set_status("revisions", batch=batch)
+            if revs:
+                history["offset"] += len(revs)
+                batch.set_option(buf, "modifiable", True)
+                batch.append_lines(buf, self.revision_lines(history["wp"], revs))
+                batch.set_option(buf, "modifiable", False)
+            if err is not None:
+                batch.request(
+                    "nvim_err_write", "DokuVimKi XML-RPC Error: {}\n".format(err)
+                )
+
     @pynvim.function("DWNrefreshIndex", sync=True)
     def dwn_refresh_index(self, args):
         if len(args) > 1:
@@ -841,7 +1842,10 @@ class DokuVimNG:
             )
             self._nvim.command("setlocal modifiable")
 
-            blinks = self.xmlrpc.pages.backlinks(wp)
+            if self.unlinked_pages() == 0:
+                blinks = self.links.linking(wp)
+            else:
+                blinks = self.xmlrpc.pages.backlinks(wp)
 
             if len(blinks) > 0:
                 self.buffers["backlinks"].buf[:] = list(map(str, blinks))
@@ -856,6 +1860,113 @@ class DokuVimNG:
         except dokuwiki.DokuWikiError as err:
             self._nvim.err_write("DokuVimKi XML-RPC Error: {}\n".format(err))
 
+    def unlinked_pages(self):
+        """
+        Returns the number of pages missing in the link graph.
+        """
+
+        return sum(1 for wp in self.page_index.pages if wp not in self.links)
+
+    def links_notice(self):
+        missing = self.unlinked_pages()
+        if missing:
+            self._nvim.err_write(
+                "DokuVimNG: {} of {} pages are not indexed yet, use :DWNgrep! to "
+                "index all pages.\n".format(missing, len(self.page_index))
+            )
+
+    @pynvim.command(
+        "DWNlinks", nargs="?", complete="customlist,DWNcompletePages", sync=True
+    )
+    def dwn_links(self, args):
+        if not self.dwn_init():
+            return
+
+        if len(args) == 1:
+            wp = args[0]
+        else:
+            wp = self._nvim.current.buffer.name.rsplit(os.sep, 1)[-1]
+            if wp not in self.buffers or not self.buffers[wp].iswp:
+                self._nvim.err_write("DokuVimNG Error: No wiki page given\n")
+                return
+
+        self.forward_links(wp)
+
+    def forward_links(self, wp):
+        """
+        Lists the pages linked and the media embedded by a page.
+        """
+
+        if wp not in self.links:
+            try:
+                perm, text, locked = self.fetch_page(wp)
+            except dokuwiki.DokuWikiError as err:
+                self._nvim.err_write("DokuVimKi XML-RPC Error: {}\n".format(err))
+                return
+            if text:
+                self.links.add(wp, text, replace=False)
+
+        pages, media = self.links.forward(wp)
+        if pages or media:
+            self.show_links(pages + media)
+        else:
+            self._nvim.err_write(
+                "DokuVimNG Error: No links found on page: {}\n".format(wp)
+            )
+
+    @pynvim.command("DWNorphans", nargs=0, sync=True)
+    def dwn_orphans(self):
+        if not self.dwn_init():
+            return
+
+        self.links_notice()
+        orphans = self.links.orphans(self.page_index.pages)
+        if orphans:
+            self.show_links(orphans)
+        else:
+            self._nvim.out_write("No orphaned pages found.\n")
+
+    @pynvim.command("DWNdeadLinks", nargs=0, sync=True)
+    def dwn_dead_links(self):
+        if not self.dwn_init():
+            return
+
+        self.links_notice()
+        dead = self.links.dead_links(
+            self.page_index.page_set, self.page_index.media_set
+        )
+        if dead:
+            self.show_links(["{}\t{}".format(wp, target) for wp, target in dead])
+        else:
+            self._nvim.out_write("No dead links found.\n")
+
+    def show_links(self, lines):
+        if self.diffmode:
+            self.diff_close()
+
+        self.focus(2)
+
+        buf = self.buffers["links"].buf
+        with Batch(self._nvim) as batch:
+            batch.command("silent! buffer! {}".format(self.buffers["links"].num))
+            batch.set_option(buf, "modifiable", True)
+            batch.set_lines(buf, lines)
+            batch.set_option(buf, "modifiable", False)
+            batch.command("map <silent> <buffer> <enter> :call DWNlinkEdit()<CR>")
+
+    @pynvim.function("DWNlinkEdit", sync=True)
+    def link_edit(self, args=None):
+        """
+        Special mapping for opening the page of the line under the cursor in
+        the links buffer.
+        """
+
+        if not self.dwn_init():
+            return
+
+        row, col = self._nvim.current.window.cursor
+        self.edit(self._nvim.current.buffer[row - 1].split("\t")[0])
+
     @pynvim.command("DWNsearch", nargs="?")
     def dwn_search(self, args):
         if len(args) == 1:
@@ -889,9 +2000,9 @@ class DokuVimNG:
 
                 if pattern:
                     p = re.compile(pattern)
-                    result = list(filter(p.search, self.pages))
+                    result = list(filter(p.search, self.page_index.entries))
                 else:
-                    result = self.pages
+                    result = self.page_index.entries
 
                 if len(result) > 0:
                     self.buffers["search"].buf[:] = result
@@ -907,9 +2018,9 @@ class DokuVimNG:
 
                 if pattern:
                     p = re.compile(pattern)
-                    result = list(filter(p.search, self.media))
+                    result = list(filter(p.search, self.page_index.media))
                 else:
-                    result = self.media
+                    result = self.page_index.media
 
                 if len(result) > 0:
                     self.buffers["media"].buf[:] = result
@@ -924,7 +2035,7 @@ class DokuVimNG:
             pass
 
     @pynvim.command("DWNclose", bang=True, nargs=0, sync=True)
-    def close(self, buffer, bang=False):
+    def close(self, buffer, bang=False, unlock=True):
         if not self.dwn_init():
             return
 
@@ -950,9 +2061,10 @@ class DokuVimNG:
                 self._nvim.command("bp!")
                 # Ignore any failure deleting this buffer e.g. if it has been manually deleted before
                 self._nvim.command("silent! bdel! {}".format(self.buffers[buffer].num))
-                if self.buffers[buffer].type == "acwrite":
+                if self.buffers[buffer].type == "acwrite" and unlock:
                     self.unlock(buffer)
                 del self.buffers[buffer]
+                return True
             else:
                 self._nvim.err_write(
                     'You cannot close special buffer "{}"!\n'.format(buffer)
@@ -973,44 +2085,64 @@ class DokuVimNG:
         """
 
         unsaved = []
+        for wiki in list(self.wikis.values()):
+            unsaved += self.in_wiki(wiki, self.close_pages, bang)
+
+        if len(unsaved) == 0:
+            self._nvim.command("silent! quitall")
+        else:
+            print(
+                "Some buffers contain unsaved changes. Use DWquit! if you really want to quit.",
+                file=sys.stderr,
+            )
+
+    def close_pages(self, bang):
+        """
+        Closes the page buffers of the wiki the caller works for and returns
+        the pages with unsaved changes left open.
+        """
+
+        unsaved = []
+        locked = []
 
         for buffer in list(self.buffers):
             if self.buffers[buffer].iswp:
+                acwrite = self.buffers[buffer].type == "acwrite"
                 if not self.ismodified(buffer):
                     self._nvim.command(
                         "silent! buffer! {}".format(self.buffers[buffer].num)
                     )
-                    self.close(buffer)
+                    if self.close(buffer, unlock=False) and acwrite:
+                        locked.append(buffer)
                 elif self.ismodified(buffer) and bang:
                     self._nvim.command(
                         "silent! buffer! {}".format(self.buffers[buffer].num)
                     )
-                    self.close(buffer, bang=True)
+                    if self.close(buffer, bang=True, unlock=False) and acwrite:
+                        locked.append(buffer)
                 else:
                     unsaved.append(buffer)
 
-        if len(unsaved) == 0:
-            self._nvim.command("silent! quitall")
-        else:
-            print(
-                "Some buffers contain unsaved changes. Use DWquit! if you really want to quit.",
-                file=sys.stderr,
-            )
+        self.unlock_pages(locked)
+        self.fulltext.save()
+        return unsaved
 
-    def ismodified(self, buffer):
+    def ismodified(self, buffer, lines=None):
         """
-        Checks whether the current buffer or a given buffer is modified or not.
+        Checks whether a buffer differs from the last saved text of its page.
+        The content is only read and hashed again if b:changedtick moved since
+        the last check, otherwise this costs a single api call. Already read
+        lines of the buffer can be passed in.
         """
 
-        if self.buffers[buffer].need_save:
-            return True
-        elif (
-            "\n".join(self.buffers[buffer].page).strip()
-            != "\n".join(self.buffers[buffer].buf).strip()
-        ):
-            return True
-        else:
-            return False
+        buffer = self.buffers[buffer]
+        tick = buffer.buf.api.get_changedtick()
+        if tick != buffer.tick:
+            if lines is None:
+                lines = buffer.buf[:]
+            buffer.modified = digest("\n".join(lines)) != buffer.digest
+            buffer.tick = tick
+        return buffer.modified
 
     @pynvim.function("DWNrevEdit", sync=True)
     def rev_edit(self, args=None):
@@ -1034,60 +2166,156 @@ class DokuVimNG:
         if int(self._nvim.eval("winnr()")) != winnr:
             self._nvim.command(str(winnr) + "wincmd w")
 
-    def refresh(self):
+    def refresh(self, full=False, background=None):
         """
-        Refreshes the page index by retrieving a fresh list of all pages on the
-        remote server and updating the completion dictionary.
+        Refreshes the page index and updating the completion dictionary. Only
+        the changes since the last sync are retrieved from the remote server
+        unless a full rebuild is requested or nothing is cached yet.
+
+        In background mode the index is fetched by a worker thread while the
+        index window keeps showing the old one until the new one is swapped in.
         """
 
-        self.pages = []
-        self.media = []
+        if background is None:
+            background = self.cfg["async_refresh"]
 
-        try:
-            print("Refreshing page index!", file=sys.stdout)
-            data = self.xmlrpc.pages.list()
-
-            if data:
-                for page in data:
-                    page = page["id"]
-                    self.pages.append(page)
-                    # Add the page's namespace if not the root namespace
-                    if ":" not in page:
-                        continue
-                    ns = page.rsplit(":", 1)[0] + ":"
-                    if ns not in self.pages:
-                        self.pages.append(ns)
-                        self.media.append(ns)
+        if background:
+            if not self.refreshing:
+                self.refreshing = True
+                self.set_status("index", " refreshing…")
+                self.submit(self.worker, self.refresh_worker, full)
+            return
 
-            self.pages.sort()
+        try:
+            self._nvim.out_write("Refreshing page index!\n")
+            self.swap_index(*self.fetch_index(self.xmlrpc, full))
+        except dokuwiki.DokuWikiError as err:
+            self.refresh_failed(err)
 
-            self._nvim.out_write("Refreshing media index!\n")
-            data = self.xmlrpc.medias.list()
+    def refresh_worker(self, full):
+        try:
+            cache, changes = self.fetch_index(self.client(), full)
+        except Exception as err:
+            self.async_call(self.refresh_failed, err)
+        else:
+            self.async_call(self.swap_index, cache, changes)
+
+    def refresh_failed(self, err):
+        self.refreshing = False
+        self.index_updates = []
+        self.set_status("index")
+        self._nvim.err_write(
+            "Failed to fetch page list. Please check your configuration {}\n".format(
+                err
+            )
+        )
 
-            if data:
-                for media in data:
-                    self.media.append(media["id"])
+    def fetch_index(self, xmlrpc, full=False):
+        """
+        Returns an updated copy of the index cache and the page changes since
+        the last sync. Doesn't touch any editor state so it can run on a
+        worker thread.
+        """
 
-            self.media.sort()
+        cache = self.index_cache.copy()
+        timestamp = int(xmlrpc.time)
+        changes = []
 
-        except dokuwiki.DokuWikiError as err:
-            self._nvim.err_write(
-                "Failed to fetch page list. Please check your configuration {}\n".format(
-                    err
-                )
+        # the wiki drops changes older than recent_days, after a longer break
+        # some of them would be missed
+        max_age = self.cfg["index_max_age"]
+        if (
+            full
+            or not cache.timestamp
+            or (max_age and timestamp - cache.timestamp > max_age)
+        ):
+            pages = [page["id"] for page in xmlrpc.pages.list() or []]
+            listing = xmlrpc.medias.list() or []
+            media = [media["id"] for media in listing]
+            cache.reset(pages, media, timestamp)
+            self.media_hashes.update(listing)
+        else:
+            changes = xmlrpc.pages.changes(cache.timestamp) or []
+            cache.apply_page_changes(changes)
+            media_changes = xmlrpc.medias.changes(cache.timestamp) or []
+            cache.apply_media_changes(media_changes)
+            self.media_hashes.update(
+                dict(change, id=change["name"]) for change in media_changes
             )
+            cache.timestamp = timestamp
+
+        self.media_hashes.save()
+
+        cache.save()
+        return cache, changes
 
-    def lock(self, wp):
+    def swap_index(self, cache, changes=()):
         """
-        Tries to obtain a lock given wiki page.
+        Replaces the index with a freshly fetched one. Pages and media added or
+        removed by this editor while it was fetched are applied to it again.
         """
 
-        try:
-            self.xmlrpc.pages.lock(wp)
-            return True
-        except dokuwiki.DokuWikiError as err:
-            self._nvim.err_write("{}\n".format(err))
-            return False
+        if self.index_updates:
+            for pages, media, removed in self.index_updates:
+                cache.update(pages, media, removed)
+            self.index_updates = []
+            cache.save()
+
+        self.index_cache = cache
+        self.build_index()
+        self.apply_changes(changes)
+        self.refreshing = False
+        with Batch(self._nvim) as batch:
+            self.set_status("index", batch=batch)
+            self.render_index(batch)
+
+    def update_index(self, pages=(), media=(), removed=False):
+        """
+        Adds page and media ids changed by this editor to the index, or removes
+        them, instead of fetching the whole index again. The listing is only
+        rendered again if it shows one of the affected namespaces.
+        """
+
+        self.index_cache.update(pages, media, removed)
+        for wp in pages:
+            if removed:
+                self.page_index.remove_page(wp)
+            else:
+                self.page_index.add_page(wp)
+        for media_id in media:
+            if removed:
+                self.page_index.remove_media(media_id)
+            else:
+                self.page_index.add_media(media_id)
+        self.index_cache.save()
+
+        # a refresh running in the background works on an older copy
+        if self.refreshing:
+            self.index_updates.append((pages, media, removed))
+
+        if any(wp.startswith(self.cur_ns) for wp in pages):
+            with Batch(self._nvim) as batch:
+                self.render_index(batch)
+
+    def build_index(self):
+        """
+        Builds the page index from the cached ids.
+        """
+
+        self.page_index = PageIndex(self.index_cache.pages, self.index_cache.media)
+
+    def set_status(self, name, status="", batch=None):
+        """
+        Sets the status shown in the statusline of a special buffer.
+        """
+
+        if batch is None:
+            with Batch(self._nvim) as batch:
+                self.set_status(name, status, batch)
+            return
+
+        batch.request("nvim_buf_set_var", self.buffers[name].buf, "dwn_status", status)
+        batch.command("redrawstatus!")
 
     def unlock(self, wp):
         """
@@ -1097,10 +2325,25 @@ class DokuVimNG:
         try:
             self.xmlrpc.pages.unlock(wp)
             return True
-        except dokuwiki.DokuWikiError as err:
+        except (dokuwiki.DokuWikiError, OSError, ProtocolError) as err:
+            # an unreachable wiki must not keep the buffer from being closed,
+            # the lock expires on the wiki
             # self._nvim.err_write("{}\n".format(err))
             return False
 
+    def unlock_pages(self, pages):
+        """
+        Unlocks several wiki pages with a single call.
+        """
+
+        if not pages:
+            return
+
+        try:
+            self.xmlrpc.send("dokuwiki.setLocks", lock=[], unlock=pages)
+        except (dokuwiki.DokuWikiError, OSError, ProtocolError):
+            pass
+
     @pynvim.function("DWNbufferCmd", sync=True)
     def buffer_cmd(self, args):
         if not self.dwn_init():
@@ -1178,32 +2421,25 @@ class DokuVimNG:
             return
         self.buffer_enter(args[0])
 
-    def buffer_enter(self, wp):
+    def buffer_enter(self, name):
         """
-        Loads the buffer on enter.
+        Sets up a page buffer on enter. Entering a page of another connected
+        wiki makes that wiki the current one.
         """
 
-        self.buffers[wp].buf[:] = self.buffers[wp].page
-        self._nvim.command("setlocal nomodified")
+        prefix, wp = name[: name.rfind("/") + 1], name[name.rfind("/") + 1 :]
+        wiki = next(
+            (wiki for wiki in self.wikis.values() if wiki.prefix == prefix),
+            self.current,
+        )
+        if wiki is not self.current:
+            self.switch_wiki(wiki)
+            self._nvim.command("silent! buffer! {}".format(self.buffers[wp].num))
+
         self.buffer_setup()
         if self.buffers[wp].type == "acwrite":
             self.switch_to_page_ns(wp)
 
-    @pynvim.function("DWNbufferLeave", sync=True)
-    def dwn_buffer_leave(self, args):
-        if not self.dwn_init():
-            return
-
-        self.buffer_leave(args[0])
-
-    def buffer_leave(self, wp):
-        if (
-            "\n".join(self.buffers[wp].buf).strip()
-            != "\n".join(self.buffers[wp].page).strip()
-        ):
-            self.buffers[wp].page[:] = self.buffers[wp].buf
-            self.buffers[wp].need_save = True
-
     @pynvim.function("DWNheadline", sync=True)
     def dwn_headline(self, args):
         hl = self.headlines[self.hdlevel]
@@ -1230,29 +2466,30 @@ class DokuVimNG:
             self.hdlevel = nlvl
 
     def buffer_setup(self):
-        self._nvim.command("setlocal textwidth=0")
-        self._nvim.command("setlocal wrap")
-        self._nvim.command("setlocal linebreak")
-        self._nvim.command("setlocal syntax=dokuwiki")
-        self._nvim.command("setlocal filetype=dokuwiki")
-        self._nvim.command("setlocal tabstop=2")
-        self._nvim.command("setlocal expandtab")
-        self._nvim.command("setlocal shiftwidth=2")
-        self._nvim.command("setlocal encoding=utf-8")
-        self._nvim.command("imap <buffer> <silent> <C-D><C-B> ****<ESC>1hi")
-        self._nvim.command("imap <buffer> <silent> <C-D><C-I> ////<ESC>1hi")
-        self._nvim.command("imap <buffer> <silent> <C-D><C-U> ____<ESC>1hi")
-        self._nvim.command("imap <buffer> <silent> <C-D><C-L> [[]]<ESC>1hi")
-        self._nvim.command("imap <buffer> <silent> <C-D><C-M> {{}}<ESC>1hi")
-        self._nvim.command(
-            "imap <buffer> <silent> <C-D><C-K> <code><CR><CR></code><ESC>ki"
-        )
-        self._nvim.command(
-            "imap <buffer> <silent> <C-D><C-F> <file><CR><CR></file><ESC>ki"
-        )
-        self._nvim.command("imap <buffer> <silent> <expr> <C-D><C-H> DWNheadline()")
-        self._nvim.command("map <buffer> <silent> <C-D><C-P> :call DWNsetLvl(1)<CR>")
-        self._nvim.command("map <buffer> <silent> <C-D><C-D> :call DWNsetLvl(1, 1)<CR>")
+        with Batch(self._nvim) as batch:
+            batch.command("setlocal textwidth=0")
+            batch.command("setlocal wrap")
+            batch.command("setlocal linebreak")
+            batch.command("setlocal syntax=dokuwiki")
+            batch.command("setlocal filetype=dokuwiki")
+            batch.command("setlocal tabstop=2")
+            batch.command("setlocal expandtab")
+            batch.command("setlocal shiftwidth=2")
+            batch.command("setlocal encoding=utf-8")
+            batch.command("imap <buffer> <silent> <C-D><C-B> ****<ESC>1hi")
+            batch.command("imap <buffer> <silent> <C-D><C-I> ////<ESC>1hi")
+            batch.command("imap <buffer> <silent> <C-D><C-U> ____<ESC>1hi")
+            batch.command("imap <buffer> <silent> <C-D><C-L> [[]]<ESC>1hi")
+            batch.command("imap <buffer> <silent> <C-D><C-M> {{}}<ESC>1hi")
+            batch.command(
+                "imap <buffer> <silent> <C-D><C-K> <code><CR><CR></code><ESC>ki"
+            )
+            batch.command(
+                "imap <buffer> <silent> <C-D><C-F> <file><CR><CR></file><ESC>ki"
+            )
+            batch.command("imap <buffer> <silent> <expr> <C-D><C-H> DWNheadline()")
+            batch.command("map <buffer> <silent> <C-D><C-P> :call DWNsetLvl(1)<CR>")
+            batch.command("map <buffer> <silent> <C-D><C-D> :call DWNsetLvl(1, 1)<CR>")
 
 
 class Buffer:
@@ -1265,6 +2502,8 @@ class Buffer:
         self.buf    = vim buffer object
         self.name   = buffer name
         self.iswp   = True if buffer represents a wiki page
+        self.digest     = digest of the last saved page text
+        self.tick       = b:changedtick of the last check
     """
 
     id = None
@@ -1277,57 +2516,74 @@ class Buffer:
         Instanziates a new buffer.
         """
         self._nvim = nvim
-        self._nvim.command("badd " + name)
-        self.num = self._nvim.eval('bufnr("' + name + '")')
+
+        with Batch(self._nvim) as batch:
+            batch.command("badd " + name)
+            num = batch.call("bufnr", name)
+        self.num = batch.results[num]
 
         # buffers are numbered from 0 in vim 7.3 and older
         # and from 1 in vim 7.4 and newer
         self.id = int(self.num)
-        self.buf = self._nvim.buffers[self.id]
         self.name = name
         self.iswp = iswp
         self.type = type
-        self.page = []
-        self.need_save = False
-        self._nvim.command("silent! buffer! {}".format(self.num))
-        self._nvim.command("setlocal buftype=" + type)
-        self._nvim.command("abbr <silent> close DWNclose")
-        self._nvim.command("abbr <silent> close! DWNclose!")
-        self._nvim.command("abbr <silent> quit DWNquit")
-        self._nvim.command("abbr <silent> quit! DWNquit!")
-        self._nvim.command("abbr <silent> q DWNquit")
-        self._nvim.command("abbr <silent> q! DWNquit!")
-        self._nvim.command("abbr <silent> qa DWNquit")
-        self._nvim.command("abbr <silent> qa! DWNquit!")
-
-        if type == "nofile":
-            self._nvim.command("setlocal nobuflisted")
-            self._nvim.command("setlocal nomodifiable")
-            self._nvim.command("setlocal noswapfile")
-            self._nvim.command("setlocal statusline=%{'[" + self.name + "]'}")
+        self.digest = None
+        self.tick = None
+        self.modified = False
+
+        with Batch(self._nvim) as batch:
+            batch.command("silent! buffer! {}".format(self.num))
+            buf = batch.request("nvim_get_current_buf")
+            batch.command("setlocal buftype=" + type)
+            batch.command("abbr <silent> close DWNclose")
+            batch.command("abbr <silent> close! DWNclose!")
+            batch.command("abbr <silent> quit DWNquit")
+            batch.command("abbr <silent> quit! DWNquit!")
+            batch.command("abbr <silent> q DWNquit")
+            batch.command("abbr <silent> q! DWNquit!")
+            batch.command("abbr <silent> qa DWNquit")
+            batch.command("abbr <silent> qa! DWNquit!")
+
+            if type == "nofile":
+                batch.command("setlocal nobuflisted")
+                batch.command("setlocal nomodifiable")
+                batch.command("setlocal noswapfile")
+                batch.command(
+                    "setlocal statusline=%{'["
+                    + self.name
+                    + "]'}%{get(b:,'dwn_status','')}"
+                )
 
-        if type == "acwrite":
-            self.diff = {}
-            self.need_save = False
-            self._nvim.command(
-                'autocmd! BufEnter <buffer> :call DWNbufferEnter("{}")'.format(
-                    self.name
+            if type == "acwrite":
+                batch.command(
+                    'autocmd! BufEnter <buffer> :call DWNbufferEnter("{}")'.format(
+                        self.name
+                    )
                 )
-            )
-            self._nvim.command(
-                'autocmd! BufLeave <buffer> :call DWNbufferLeave("{}")'.format(
-                    self.name
+                batch.command('autocmd! BufDelete <buffer> :DWNclose "{}"'.format(name))
+                batch.command(
+                    r"setlocal statusline=%{'[wp]\ "
+                    + self.name
+                    + r"'}\ %r\ [%c,%l][%p]"
                 )
-            )
-            self._nvim.command(
-                'autocmd! BufDelete <buffer> :DWNclose "{}"'.format(name)
-            )
-            self._nvim.command(
-                r"setlocal statusline=%{'[wp]\ " + self.name + r"'}\ %r\ [%c,%l][%p]"
-            )
 
-        if type == "nowrite":
-            self.diff = {}
-            self._nvim.command(
-                r"setlocal statusline=%{'[wp]\ " + self.name + r"'}\ %r\ [%c,%l][%p%%]"
-            )
+            if type == "nowrite":
+                batch.command(
+                    r"setlocal statusline=%{'[wp]\ "
+                    + self.name
+                    + r"'}\ %r\ [%c,%l][%p%%]"
+                )
+        self.buf = batch.results[buf]
+
+    def saved(self, text, tick):
+        """
+        Marks text as the saved page content at the given b:changedtick.
+        """
+
+        self.digest = digest(text)
+        self.tick = tick
+        self.modified = False
+
+
+LOAD_TIME = time.perf_counter() - LOAD_START
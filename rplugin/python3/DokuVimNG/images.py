@@ -0,0 +1,69 @@
+import io
+
+from PIL import Image
+
+FORMATS = {"png": "PNG", "webp": "WEBP", "jpeg": "JPEG", "jpg": "JPEG"}
+
+MIN_QUALITY = 30
+MIN_SIZE = 64
+
+
+def save(img, fmt, quality, optimize):
+    """
+    Returns the encoded image data.
+    """
+
+    out = io.BytesIO()
+    if fmt == "PNG":
+        img.save(out, fmt, optimize=optimize)
+    elif fmt == "JPEG":
+        if img.mode not in ("RGB", "L"):
+            img = img.convert("RGB")
+        img.save(out, fmt, quality=quality, optimize=optimize)
+    else:
+        img.save(out, fmt, quality=quality, method=6 if optimize else 4)
+    return out.getvalue()
+
+
+def encode(
+    img,
+    image_format="png",
+    max_width=0,
+    max_height=0,
+    quality=85,
+    optimize=False,
+    max_bytes=0,
+):
+    """
+    Encodes an image in memory and returns the data and the file extension.
+    Images larger than max_width or max_height are scaled down. If the data
+    exceeds max_bytes the quality of lossy formats is lowered first, then the
+    image is scaled down further until it fits.
+    """
+
+    ext = image_format.lower()
+    if ext not in FORMATS:
+        raise ValueError("Unsupported image format {}".format(image_format))
+    fmt = FORMATS[ext]
+
+    if max_width > 0 or max_height > 0:
+        width, height = img.size
+        size = (max_width or width, max_height or height)
+        if width > size[0] or height > size[1]:
+            img = img.copy()
+            img.thumbnail(size, Image.LANCZOS)
+
+    data = save(img, fmt, quality, optimize)
+    if max_bytes <= 0:
+        return data, ext
+
+    while len(data) > max_bytes and fmt != "PNG" and quality > MIN_QUALITY:
+        quality = max(MIN_QUALITY, quality - 15)
+        data = save(img, fmt, quality, optimize)
+
+    while len(data) > max_bytes and min(img.size) > MIN_SIZE:
+        width, height = img.size
+        img = img.resize((width * 3 // 4, height * 3 // 4), Image.LANCZOS)
+        data = save(img, fmt, quality, optimize)
+
+    return data, ext
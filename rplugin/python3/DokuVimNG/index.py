@@ -0,0 +1,208 @@
+import sys
+
+from bisect import bisect_left, insort
+from heapq import merge
+from itertools import islice
+
+
+def complete(items, prefix, limit):
+    """
+    Returns at most limit entries of the sorted list items which start with
+    prefix.
+    """
+
+    ret = []
+    for item in islice(items, bisect_left(items, prefix), None):
+        if len(ret) >= limit or not item.startswith(prefix):
+            break
+        ret.append(item)
+    return ret
+
+
+def remove_sorted(items, item):
+    """
+    Removes item from the sorted list items if it is there.
+    """
+
+    i = bisect_left(items, item)
+    if i < len(items) and items[i] == item:
+        del items[i]
+
+
+class Namespace:
+    """
+    Node of the namespace tree.
+
+        self.namespaces = child namespaces by name
+        self.pages      = names of the pages inside this namespace
+    """
+
+    __slots__ = ("namespaces", "pages")
+
+    def __init__(self):
+        self.namespaces = {}
+        self.pages = set()
+
+
+class NamespaceTree:
+    """
+    Tree of all namespaces of a wiki, so listing the contents of a namespace
+    only touches its children instead of every page of the wiki.
+    """
+
+    def __init__(self, pages=()):
+        self.root = Namespace()
+        for page in pages:
+            self.add(page)
+
+    def add(self, page):
+        """
+        Adds a page id like "ns:sub:page" to the tree.
+        """
+
+        *parts, name = page.split(":")
+        node = self.root
+        for part in parts:
+            child = node.namespaces.get(part)
+            if child is None:
+                child = node.namespaces[sys.intern(part)] = Namespace()
+            node = child
+        node.pages.add(sys.intern(name))
+
+    def remove(self, page):
+        """
+        Removes a page id from the tree and prunes namespaces left empty.
+        """
+
+        *parts, name = page.split(":")
+        path = [self.root]
+        for part in parts:
+            node = path[-1].namespaces.get(part)
+            if node is None:
+                return
+            path.append(node)
+
+        path[-1].pages.discard(name)
+        for i in range(len(parts), 0, -1):
+            if path[i].pages or path[i].namespaces:
+                break
+            del path[i - 1].namespaces[parts[i - 1]]
+
+    def find(self, ns):
+        """
+        Returns the node for a namespace like "ns:sub:" or None if it does not
+        exist. The empty string is the root namespace.
+        """
+
+        node = self.root
+        for part in ns.split(":")[:-1]:
+            node = node.namespaces.get(part)
+            if node is None:
+                return None
+        return node
+
+    def listing(self, ns):
+        """
+        Returns the sorted sub namespaces and pages of a namespace.
+        """
+
+        node = self.find(ns)
+        if node is None:
+            return [], []
+        return sorted(node.namespaces), sorted(node.pages)
+
+
+class PageIndex:
+    """
+    Index of the page and media ids of a wiki. All ids are interned and the
+    sorted lists are built once from the sets, so building it is O(n log n).
+
+        self.page_set       = page ids
+        self.namespace_set  = namespaces containing pages like "ns:sub:"
+        self.media_set      = media ids
+        self.pages          = sorted page ids
+        self.namespaces     = sorted namespaces
+        self.media          = sorted media ids
+        self.entries        = sorted page ids and namespaces
+        self.tree           = NamespaceTree of the pages
+    """
+
+    def __init__(self, pages=(), media=()):
+        intern = sys.intern
+
+        self.page_set = set()
+        self.namespace_set = set()
+        for page in pages:
+            page = intern(page)
+            self.page_set.add(page)
+            i = page.rfind(":")
+            if i >= 0:
+                self.namespace_set.add(intern(page[: i + 1]))
+        self.media_set = {intern(media_id) for media_id in media}
+
+        self.pages = sorted(self.page_set)
+        self.namespaces = sorted(self.namespace_set)
+        self.media = sorted(self.media_set)
+        self.entries = list(merge(self.pages, self.namespaces))
+        self.tree = NamespaceTree(self.pages)
+
+    def __contains__(self, page):
+        return page in self.page_set
+
+    def add_page(self, page):
+        """
+        Adds a single page id without rebuilding the index.
+        """
+
+        if page in self.page_set:
+            return
+
+        page = sys.intern(page)
+        self.page_set.add(page)
+        insort(self.pages, page)
+        insort(self.entries, page)
+        self.tree.add(page)
+
+        i = page.rfind(":")
+        ns = page[: i + 1]
+        if i >= 0 and ns not in self.namespace_set:
+            ns = sys.intern(ns)
+            self.namespace_set.add(ns)
+            insort(self.namespaces, ns)
+            insort(self.entries, ns)
+
+    def remove_page(self, page):
+        """
+        Removes a single page id without rebuilding the index.
+        """
+
+        if page not in self.page_set:
+            return
+
+        self.page_set.discard(page)
+        remove_sorted(self.pages, page)
+        remove_sorted(self.entries, page)
+        self.tree.remove(page)
+
+        i = page.rfind(":")
+        ns = page[: i + 1]
+        if i >= 0:
+            node = self.tree.find(ns)
+            if node is None or not node.pages:
+                self.namespace_set.discard(ns)
+                remove_sorted(self.namespaces, ns)
+                remove_sorted(self.entries, ns)
+
+    def add_media(self, media_id):
+        if media_id not in self.media_set:
+            media_id = sys.intern(media_id)
+            self.media_set.add(media_id)
+            insort(self.media, media_id)
+
+    def remove_media(self, media_id):
+        if media_id in self.media_set:
+            self.media_set.discard(media_id)
+            remove_sorted(self.media, media_id)
+
+    def __len__(self):
+        return len(self.page_set)
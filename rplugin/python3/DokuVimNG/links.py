@@ -0,0 +1,151 @@
+import re
+import threading
+
+LINK_RE = re.compile(r"\[\[([^\]|]*)(?:\|.*?)?\]\]")
+MEDIA_RE = re.compile(r"\{\{([^}|?]*)")
+EXTERNAL_RE = re.compile(r"^([a-z][a-z0-9+.-]*://|mailto:|\\\\)|[>@]", re.IGNORECASE)
+
+
+def resolve(ns, target):
+    """
+    Returns the absolute id of a link target found on a page in namespace ns
+    like "ns:sub:", or None for external and interwiki targets.
+    """
+
+    target = target.strip()
+    if not target or EXTERNAL_RE.search(target):
+        return None
+
+    if target.startswith(":"):
+        target = target[1:]
+    elif target.startswith("."):
+        parts = ns.split(":")[:-1]
+        segments = target.split(":")
+        for segment in segments[:-1]:
+            if segment == "..":
+                parts = parts[:-1]
+            elif segment != ".":
+                parts.append(segment)
+        target = ":".join(parts + [segments[-1]])
+    elif ":" not in target:
+        target = ns + target
+
+    target = ":".join(
+        part.strip().lower().replace(" ", "_") for part in target.split(":")
+    )
+    target = target.strip(":") + (":" if target.endswith(":") else "")
+    if not target or target.endswith(":"):
+        target += "start"
+    return target
+
+
+def parse(wp, text):
+    """
+    Returns the page ids linked and the media ids embedded by a page.
+    """
+
+    ns = wp.rsplit(":", 1)[0] + ":" if ":" in wp else ""
+
+    pages = set()
+    for target in LINK_RE.findall(text):
+        target = target.split("#", 1)[0]
+        if target.strip():
+            page = resolve(ns, target)
+            if page is not None and page != wp:
+                pages.add(page)
+
+    media = set()
+    for target in MEDIA_RE.findall(text):
+        media_id = resolve(ns, target)
+        if media_id is not None:
+            media.add(media_id)
+
+    return pages, media
+
+
+class LinkGraph:
+    """
+    Links between the pages of a wiki parsed from their contents, so backlinks
+    and link reports don't need the remote wiki.
+
+        self.links      = page id -> set of linked page ids
+        self.media      = page id -> set of embedded media ids
+        self.backlinks  = page id -> set of page ids linking to it
+    """
+
+    def __init__(self):
+        self.links = {}
+        self.media = {}
+        self.backlinks = {}
+        self.lock = threading.RLock()
+
+    def __contains__(self, wp):
+        return wp in self.links
+
+    def add(self, wp, text, replace=True):
+        """
+        Adds the links of a page, replacing its previous ones unless replace
+        is False and the page is known already.
+        """
+
+        pages, media = parse(wp, text)
+        with self.lock:
+            if wp in self.links and not replace:
+                return
+
+            self.remove(wp)
+            self.links[wp] = pages
+            self.media[wp] = media
+            for page in pages:
+                self.backlinks.setdefault(page, set()).add(wp)
+
+    def remove(self, wp):
+        with self.lock:
+            for page in self.links.pop(wp, ()):
+                linking = self.backlinks.get(page)
+                if linking is not None:
+                    linking.discard(wp)
+                    if not linking:
+                        del self.backlinks[page]
+            self.media.pop(wp, None)
+
+    def forward(self, wp):
+        """
+        Returns the sorted page and media ids referenced by a page.
+        """
+
+        with self.lock:
+            return sorted(self.links.get(wp, ())), sorted(self.media.get(wp, ()))
+
+    def linking(self, wp):
+        """
+        Returns the sorted ids of the pages linking to a page.
+        """
+
+        with self.lock:
+            return sorted(self.backlinks.get(wp, ()))
+
+    def orphans(self, pages):
+        """
+        Returns the pages no other page links to.
+        """
+
+        with self.lock:
+            return [wp for wp in pages if wp not in self.backlinks]
+
+    def dead_links(self, pages, media):
+        """
+        Returns (page id, target) for all links to pages not in pages and all
+        embedded media not in media.
+        """
+
+        with self.lock:
+            dead = []
+            for wp in sorted(self.links):
+                for page in sorted(self.links[wp]):
+                    if page not in pages:
+                        dead.append((wp, page))
+                for media_id in sorted(self.media[wp]):
+                    if media_id not in media:
+                        dead.append((wp, media_id))
+            return dead
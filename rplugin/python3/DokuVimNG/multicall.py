@@ -0,0 +1,90 @@
+import weakref
+
+from xmlrpc.client import Fault
+
+import dokuwiki
+
+
+class MultiCall:
+    """
+    Collects independent xmlrpc calls for a DokuWiki client and sends them as
+    a single system.multicall request. Servers without multicall support get
+    the calls one after another.
+
+        calls = MultiCall(xmlrpc)
+        perm = calls.add("wiki.aclCheck", wp)
+        calls.run()
+        calls.result(perm)
+    """
+
+    # clients of servers which don't support system.multicall
+    unsupported = weakref.WeakSet()
+
+    def __init__(self, xmlrpc):
+        self.xmlrpc = xmlrpc
+        self.calls = []
+        self.results = []
+
+    def add(self, command, *args, **kwargs):
+        """
+        Queues a call like DokuWiki.send() and returns the position of its
+        result.
+        """
+
+        args = list(args)
+        if kwargs:
+            args.append(kwargs)
+        self.calls.append((command, args))
+        return len(self.calls) - 1
+
+    def run(self):
+        """
+        Sends all queued calls. Failed calls get a DokuWikiError as result,
+        except for the faults the DokuWiki client maps to empty results.
+        """
+
+        if not self.calls:
+            return self.results
+
+        if len(self.calls) > 1 and self.xmlrpc not in self.unsupported:
+            try:
+                responses = self.xmlrpc.proxy.system.multicall(
+                    [
+                        {"methodName": command, "params": args}
+                        for command, args in self.calls
+                    ]
+                )
+            except Fault:
+                self.unsupported.add(self.xmlrpc)
+            else:
+                self.results = [self.response(r) for r in responses]
+                return self.results
+
+        self.results = []
+        for command, args in self.calls:
+            try:
+                self.results.append(self.xmlrpc.send(command, *args))
+            except dokuwiki.DokuWikiError as err:
+                self.results.append(err)
+        return self.results
+
+    def response(self, response):
+        if isinstance(response, list):
+            return response[0]
+
+        fault = Fault(response["faultCode"], response["faultString"])
+        if fault.faultCode == 121:
+            return {}
+        elif fault.faultCode == 321:
+            return []
+        return dokuwiki.DokuWikiError(fault)
+
+    def result(self, index):
+        """
+        Returns the result of a call or raises its error.
+        """
+
+        result = self.results[index]
+        if isinstance(result, dokuwiki.DokuWikiError):
+            raise result
+        return result
@@ -0,0 +1,213 @@
+import gzip
+import hashlib
+import json
+import re
+import sys
+import threading
+
+from urllib.parse import quote
+
+from DokuVimNG.cache import write_atomic
+
+WORD_RE = re.compile(r"\w+")
+QUERY_RE = re.compile(r'"([^"]*)"|(\S+)')
+
+
+def words(text):
+    return set(WORD_RE.findall(text.lower()))
+
+
+class FullTextIndex:
+    """
+    Inverted index over the contents of wiki pages answering word and phrase
+    queries locally. Only the words of the pages are held in memory, their
+    contents are kept on disk with one compressed file per page and read for
+    the candidates of a query. Without a path the contents stay in memory.
+
+        self.docs   = page id -> {"version": revision, "digest": content hash,
+                      "words": words of the content}
+        self.words  = word -> set of page ids containing it
+        self.texts  = page id -> content not kept on disk
+    """
+
+    def __init__(self, path=None, delay=30):
+        self.path = path
+        self.delay = delay
+        self.docs = {}
+        self.words = {}
+        self.texts = {}
+        self.dirty = False
+        self.timer = None
+        self.lock = threading.RLock()
+
+    def file(self, wp):
+        return self.path / "pages" / "{}.gz".format(quote(wp, safe=""))
+
+    def load(self):
+        if self.path is None:
+            return
+
+        try:
+            with gzip.open(self.path / "index.json.gz", "rt") as f:
+                docs = json.load(f)
+        except (OSError, ValueError):
+            return
+
+        with self.lock:
+            for wp, doc in docs.items():
+                if wp not in self.docs:
+                    self.insert(wp, doc["version"], doc["digest"], doc["words"])
+
+    def save(self):
+        """
+        Writes the words of the pages to disk if anything changed since the
+        last save.
+        """
+
+        if self.path is None or not self.dirty:
+            return
+
+        with self.lock:
+            data = json.dumps(self.docs)
+            self.dirty = False
+
+        try:
+            write_atomic(
+                self.path / "index.json.gz", gzip.compress(data.encode("utf-8"))
+            )
+        except OSError:
+            pass
+
+    def save_later(self):
+        """
+        Saves the index after delay seconds, changes made until then are
+        written with the same save.
+        """
+
+        with self.lock:
+            if self.timer is not None and self.timer.is_alive():
+                return
+
+            self.timer = threading.Timer(self.delay, self.save)
+            self.timer.daemon = True
+            self.timer.start()
+
+    def __contains__(self, wp):
+        return wp in self.docs
+
+    def version(self, wp):
+        with self.lock:
+            doc = self.docs.get(wp)
+            return doc["version"] if doc else None
+
+    def text(self, wp):
+        """
+        Returns the indexed content of a page or None.
+        """
+
+        text = self.texts.get(wp)
+        if text is not None or self.path is None:
+            return text
+
+        try:
+            return gzip.decompress(self.file(wp).read_bytes()).decode("utf-8")
+        except (OSError, ValueError):
+            return None
+
+    def add(self, wp, text, version=None):
+        digest = hashlib.sha1(text.encode("utf-8")).hexdigest()
+        with self.lock:
+            doc = self.docs.get(wp)
+            if doc is not None and doc["digest"] == digest:
+                if doc["version"] != version:
+                    doc["version"] = version
+                    self.dirty = True
+                return
+
+            self.remove(wp)
+            self.store(wp, text)
+            self.insert(wp, version, digest, words(text))
+            self.dirty = True
+
+    def insert(self, wp, version, digest, page_words):
+        page_words = tuple(sys.intern(word) for word in page_words)
+        self.docs[wp] = {"version": version, "digest": digest, "words": page_words}
+        for word in page_words:
+            self.words.setdefault(word, set()).add(wp)
+
+    def store(self, wp, text):
+        if self.path is not None:
+            file = self.file(wp)
+            try:
+                file.parent.mkdir(parents=True, exist_ok=True)
+                write_atomic(file, gzip.compress(text.encode("utf-8")))
+                return
+            except OSError:
+                pass
+
+        self.texts[wp] = text
+
+    def remove(self, wp):
+        with self.lock:
+            doc = self.docs.pop(wp, None)
+            if doc is None:
+                return
+
+            for word in doc["words"]:
+                pages = self.words.get(word)
+                if pages is not None:
+                    pages.discard(wp)
+                    if not pages:
+                        del self.words[word]
+
+            if self.texts.pop(wp, None) is None and self.path is not None:
+                try:
+                    self.file(wp).unlink()
+                except OSError:
+                    pass
+            self.dirty = True
+
+    def search(self, query):
+        """
+        Returns (page id, line number, line) for all lines matching a query.
+        A query consists of words and "quoted phrases", a page matches if it
+        contains all of them.
+        """
+
+        terms = []
+        for phrase, word in QUERY_RE.findall(query.lower()):
+            term = phrase or word
+            if term.strip():
+                terms.append(term)
+
+        if not terms:
+            return []
+
+        query_words = set()
+        for term in terms:
+            query_words |= words(term)
+
+        with self.lock:
+            candidates = None
+            for word in sorted(query_words, key=lambda w: len(self.words.get(w, ()))):
+                pages = self.words.get(word, set())
+                candidates = pages if candidates is None else candidates & pages
+            if candidates is None:
+                candidates = set(self.docs)
+
+            candidates = sorted(candidates)
+
+        patterns = [
+            re.compile(r"(?<!\w)" + re.escape(term) + r"(?!\w)", re.IGNORECASE)
+            for term in terms
+        ]
+
+        result = []
+        for wp in candidates:
+            text = self.text(wp)
+            if text is None or not all(pattern.search(text) for pattern in patterns):
+                continue
+            for num, line in enumerate(text.split("\n"), 1):
+                if any(pattern.search(line) for pattern in patterns):
+                    result.append((wp, num, line))
+        return result
@@ -0,0 +1,215 @@
+import json
+import os
+import re
+import threading
+import time
+
+from collections import deque
+
+import msgpack
+
+METHOD_RE = re.compile(rb"<methodName>([^<]+)</methodName>")
+
+
+def percentile(values, p):
+    values = sorted(values)
+    if not values:
+        return 0.0
+    return values[int(round(p * (len(values) - 1)))]
+
+
+def size(obj):
+    """
+    Returns the msgpack encoded size of an nvim api argument or result.
+    """
+
+    try:
+        return len(msgpack.packb(obj, default=lambda o: getattr(o, "handle", 0)))
+    except (TypeError, ValueError):
+        return 0
+
+
+def format_bytes(num):
+    for unit in ["B", "K", "M"]:
+        if num < 1024:
+            return "{:.0f}{}".format(num, unit)
+        num /= 1024
+    return "{:.1f}G".format(num)
+
+
+class Stats:
+    """
+    Collects call counts, latencies and transferred bytes of the xmlrpc and
+    nvim api calls, optionally tracing every call to a JSON lines file.
+
+        self.methods[(kind, method)]    = {"count", "sent", "received", "times"}
+    """
+
+    def __init__(self, trace_file=""):
+        self.lock = threading.Lock()
+        self.methods = {}
+        self.trace = None
+        if trace_file:
+            self.trace = open(os.path.expanduser(trace_file), "a", buffering=1)
+
+    def record(self, kind, method, seconds, sent=0, received=0):
+        with self.lock:
+            entry = self.methods.get((kind, method))
+            if entry is None:
+                entry = self.methods[(kind, method)] = {
+                    "count": 0,
+                    "sent": 0,
+                    "received": 0,
+                    "times": deque(maxlen=1000),
+                }
+            entry["count"] += 1
+            entry["sent"] += sent
+            entry["received"] += received
+            entry["times"].append(seconds)
+
+            if self.trace is not None:
+                self.trace.write(
+                    json.dumps(
+                        {
+                            "time": time.time(),
+                            "kind": kind,
+                            "method": method,
+                            "ms": round(seconds * 1000, 3),
+                            "sent": sent,
+                            "received": received,
+                            "thread": threading.current_thread().name,
+                        }
+                    )
+                    + "\n"
+                )
+
+    def reset(self):
+        with self.lock:
+            self.methods = {}
+
+    def report(self):
+        """
+        Returns the collected statistics as lines of a table, the most time
+        consuming methods first.
+        """
+
+        fmt = "{:8}{:40}{:>8}{:>10}{:>10}{:>12}{:>10}{:>10}"
+        lines = [
+            fmt.format(
+                "kind",
+                "method",
+                "calls",
+                "p50 ms",
+                "p95 ms",
+                "total ms",
+                "sent",
+                "received",
+            )
+        ]
+
+        with self.lock:
+            entries = sorted(
+                self.methods.items(), key=lambda item: -sum(item[1]["times"])
+            )
+            for (kind, method), entry in entries:
+                times = list(entry["times"])
+                lines.append(
+                    fmt.format(
+                        kind,
+                        method,
+                        entry["count"],
+                        "{:.1f}".format(percentile(times, 0.5) * 1000),
+                        "{:.1f}".format(percentile(times, 0.95) * 1000),
+                        "{:.1f}".format(sum(times) * 1000),
+                        format_bytes(entry["sent"]),
+                        format_bytes(entry["received"]),
+                    )
+                )
+        return lines
+
+    def instrument_xmlrpc(self, xmlrpc):
+        """
+        Wraps the transport of a DokuWiki client to record every request.
+        """
+
+        transport = xmlrpc.proxy("transport")
+        request = transport.request
+        parse_response = transport.parse_response
+        received = [0]
+
+        def counting_parse_response(response):
+            read = response.read
+
+            def counting_read(*args):
+                data = read(*args)
+                received[0] += len(data)
+                return data
+
+            response.read = counting_read
+            return parse_response(response)
+
+        def timed_request(host, handler, request_body, verbose=False):
+            received[0] = 0
+            match = METHOD_RE.search(request_body[:512])
+            method = match.group(1).decode("utf-8") if match else "unknown"
+            start = time.perf_counter()
+            try:
+                return request(host, handler, request_body, verbose)
+            finally:
+                self.record(
+                    "xmlrpc",
+                    method,
+                    time.perf_counter() - start,
+                    len(request_body),
+                    received[0],
+                )
+
+        transport.request = timed_request
+        transport.parse_response = counting_parse_response
+
+    def instrument_nvim(self, nvim):
+        """
+        Wraps the msgpack session of nvim to record every api call. This
+        includes calls of other plugins running in the same host.
+        """
+
+        session = nvim._session
+        request = session.request
+
+        def timed_request(method, *args, **kwargs):
+            start = time.perf_counter()
+            result = request(method, *args, **kwargs)
+            self.record(
+                "nvim",
+                method,
+                time.perf_counter() - start,
+                size(args),
+                size(result),
+            )
+            return result
+
+        session.request = timed_request
+
+
+class StartupTimes:
+    """
+    Durations of the startup phases of the plugin. Only the first time of
+    each phase is kept, so later reconnects don't hide a slow start.
+
+        self.phases[name]   = seconds
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.phases = {}
+
+    def record(self, name, seconds):
+        with self.lock:
+            self.phases.setdefault(name, seconds)
+
+    def report(self):
+        with self.lock:
+            return [
+                "{:30}{:>10.1f} ms".format(name, seconds * 1000)
+                for name, seconds in self.phases.items()
+            ]
@@ -0,0 +1,48 @@
+from urllib.parse import urlparse
+
+
+def wiki_alias(url):
+    """
+    Returns the short name of a wiki used to prefix its buffer names, like
+    "wiki.example.org_doku" for "https://wiki.example.org/doku/".
+    """
+
+    parsed = urlparse(url)
+    alias = (parsed.netloc + parsed.path).strip("/")
+    return alias.replace("/", "_").replace(":", "_") or url
+
+
+class Wiki:
+    """
+    Connection, caches, index and buffers of one connected wiki. Several
+    wikis can be connected at once, the plugin keeps the state of each in
+    its own instance and delegates its per wiki attributes to the wiki it
+    currently works for.
+
+        self.alias      = short name of the wiki
+        self.prefix     = prefix of the buffer names of the wiki
+    """
+
+    def __init__(self, url, user, password, prefix=False):
+        self.url = url
+        self.user = user
+        self.password = password
+        self.alias = wiki_alias(url)
+        self.prefix = self.alias + "/" if prefix else ""
+
+
+class WikiAttribute:
+    """
+    Attribute of the plugin which is stored in the wiki it works for.
+    """
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, plugin, owner=None):
+        if plugin is None:
+            return self
+        return getattr(plugin.wiki, self.name)
+
+    def __set__(self, plugin, value):
+        setattr(plugin.wiki, self.name, value)
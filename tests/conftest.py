@@ -0,0 +1,7 @@
+import sys
+
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "rplugin" / "python3"))
+sys.path.insert(0, str(ROOT / "bench"))
@@ -0,0 +1,244 @@
+from DokuVimNG.cache import (
+    ChangeLog,
+    IndexCache,
+    MediaHashes,
+    PageCache,
+    RevisionCache,
+    SaveQueue,
+)
+
+
+def test_index_cache_round_trip(tmp_path):
+    cache = IndexCache(tmp_path / "index.json")
+    cache.reset(["ns:a", "b"], ["ns:img.png"], 1000)
+    cache.save()
+
+    loaded = IndexCache(tmp_path / "index.json")
+    assert loaded.load() is True
+    assert loaded.pages == {"ns:a", "b"}
+    assert loaded.media == {"ns:img.png"}
+    assert loaded.timestamp == 1000
+
+
+def test_index_cache_load_missing_or_broken(tmp_path):
+    assert IndexCache(None).load() is False
+    assert IndexCache(tmp_path / "missing.json").load() is False
+
+    path = tmp_path / "index.json"
+    path.write_text("{broken")
+    cache = IndexCache(path)
+    assert cache.load() is False
+    assert cache.pages == set() and cache.timestamp == 0
+
+
+def test_index_cache_applies_changes():
+    cache = IndexCache()
+    cache.reset(["a", "b"], ["m1"], 1)
+
+    cache.apply_page_changes([{"name": "c", "size": 10}, {"name": "a", "size": 0}])
+    cache.apply_media_changes([{"name": "m2", "size": 5}, {"name": "m1", "size": 0}])
+
+    assert cache.pages == {"b", "c"}
+    assert cache.media == {"m2"}
+
+
+def test_index_cache_copy_is_independent():
+    cache = IndexCache()
+    cache.reset(["a"], [], 1)
+    copy = cache.copy()
+    copy.pages.add("b")
+
+    assert cache.pages == {"a"}
+
+
+def test_page_cache_persists_entries(tmp_path):
+    cache = PageCache(tmp_path / "pages", size=10)
+    cache.load()
+    cache.put("ns:page", "text", 42, 2)
+
+    loaded = PageCache(tmp_path / "pages", size=10)
+    loaded.load()
+    entry = loaded.get("ns:page")
+    assert entry["text"] == "text"
+    assert entry["version"] == 42
+    assert entry["perm"] == 2
+    assert "checked" in entry
+
+
+def test_page_cache_evicts_least_recently_used(tmp_path):
+    cache = PageCache(tmp_path / "pages", size=2)
+    cache.load()
+    cache.put("a", "1", 1, 2)
+    cache.put("b", "2", 1, 2)
+    cache.get("a")
+    cache.put("c", "3", 1, 2)
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert not (tmp_path / "pages" / "b.json").exists()
+
+
+def test_page_cache_update_forgets_version():
+    cache = PageCache()
+    cache.put("a", "old", 1, 8)
+    cache.update("a", "new")
+
+    entry = cache.get("a")
+    assert entry["text"] == "new"
+    assert entry["version"] is None
+    assert entry["perm"] == 8
+
+    cache.discard("a")
+    assert cache.get("a") is None
+
+
+def test_revision_cache_keeps_revisions_on_disk(tmp_path):
+    cache = RevisionCache(tmp_path / "revisions", size=1)
+    cache.put("ns:page", 100, "old text")
+    cache.put("ns:page", "200", "newer text")
+
+    # only the last revision is held in memory, the other one is read back
+    assert list(cache.entries) == [("ns:page", "200")]
+    assert cache.get("ns:page", "100") == "old text"
+    assert cache.get("ns:page", 200) == "newer text"
+    assert cache.get("ns:page", 300) is None
+
+    assert RevisionCache(tmp_path / "revisions").get("ns:page", 100) == "old text"
+
+
+def test_revision_cache_without_path():
+    cache = RevisionCache(None, size=1)
+    cache.put("a", 1, "one")
+    cache.put("a", 2, "two")
+
+    assert cache.get("a", 1) is None
+    assert cache.get("a", 2) == "two"
+
+
+def change(name, version):
+    return {"name": name, "lastModified": version, "version": version, "author": "me"}
+
+
+def test_change_log_returns_only_new_changes(tmp_path):
+    log = ChangeLog(tmp_path / "changes.json")
+
+    assert len(log.add([change("a", 100), change("b", 150)], 50, 200)) == 2
+    assert log.covers(50) and not log.covers(40)
+
+    # the next fetch overlaps with the known changes
+    new = log.add([change("b", 150), change("c", 250)], 200, 300)
+    assert [c["name"] for c in new] == ["c"]
+    assert [c["name"] for c in log.query(120)] == ["b", "c"]
+    assert log.until == 300
+
+    log.save()
+    loaded = ChangeLog(tmp_path / "changes.json")
+    loaded.load()
+    assert loaded.changes == log.changes
+    assert (loaded.since, loaded.until) == (50, 300)
+
+
+def test_change_log_replaced_by_older_timeframe():
+    log = ChangeLog()
+    log.add([change("a", 100)], 50, 200)
+
+    new = log.add([change("x", 20), change("a", 100)], 10, 210)
+    assert [c["name"] for c in new] == ["x", "a"]
+    assert log.since == 10
+    assert [c["name"] for c in log.changes] == ["x", "a"]
+
+
+def test_media_hashes_round_trip(tmp_path):
+    hashes = MediaHashes(tmp_path / "media.json")
+    hashes.add("ns:a.png", "h1", 10)
+    hashes.add("other:a.png", "h1", 10, "5")
+    hashes.save()
+
+    loaded = MediaHashes(tmp_path / "media.json")
+    loaded.load()
+    assert loaded.find("h1") == ["ns:a.png", "other:a.png"]
+    assert loaded.find("h2") == []
+
+
+def test_media_hashes_follow_the_media_list():
+    hashes = MediaHashes()
+    hashes.add("a.png", "h1", 10)
+    hashes.add("b.png", "h2", 20, "7")
+
+    hashes.update(
+        [
+            # an upload without known mtime adopts the listed one
+            {"id": "a.png", "size": 10, "lastModified": 5},
+            # replaced files are forgotten
+            {"id": "b.png", "size": 21, "lastModified": 8},
+            # listed hashes are recorded
+            {"id": "c.png", "size": 3, "lastModified": 9, "hash": "h3"},
+        ]
+    )
+
+    assert hashes.entries["a.png"]["mtime"] == "5"
+    assert hashes.find("h2") == []
+    assert hashes.find("h3") == ["c.png"]
+
+    hashes.update([{"id": "a.png", "size": 10, "lastModified": 6}])
+    assert hashes.find("h1") == []
+
+
+def test_save_queue_coalesces_saves(tmp_path):
+    queue = SaveQueue(tmp_path / "journal.jsonl")
+    queue.put("a", "one", "first", 1)
+    queue.put("b", "other")
+    queue.put("a", "two", "second", 1)
+
+    assert [(wp, entry["text"]) for wp, entry in queue.pending()] == [
+        ("b", "other"),
+        ("a", "two"),
+    ]
+    assert queue.get("a")["sum"] == "second"
+
+    # a major save stays major when coalesced with minor ones
+    queue.put("b", "changed", "", 1)
+    assert queue.get("b")["minor"] == 0
+
+
+def test_save_queue_survives_restarts(tmp_path):
+    path = tmp_path / "journal.jsonl"
+    queue = SaveQueue(path)
+    queue.put("a", "one")
+    queue.put("b", "two")
+    queue.done("a", queue.get("a")["seq"])
+    with path.open("a") as f:
+        f.write('{"op": "pu')
+
+    loaded = SaveQueue(path)
+    loaded.load()
+    assert [wp for wp, _ in loaded.items()] == ["b"]
+
+    # the truncated line is gone, so appending works again
+    loaded.put("c", "three")
+    again = SaveQueue(path)
+    again.load()
+    assert [wp for wp, _ in again.items()] == ["b", "c"]
+
+    again.done("b", again.get("b")["seq"])
+    again.discard("c")
+    assert len(again) == 0
+    assert path.read_text() == ""
+
+
+def test_save_queue_keeps_newer_saves_and_failures():
+    queue = SaveQueue()
+    queue.put("a", "one")
+    seq = queue.get("a")["seq"]
+    queue.put("a", "two")
+
+    # the written save was replaced meanwhile
+    queue.done("a", seq)
+    assert queue.get("a")["text"] == "two"
+
+    queue.failed("a", queue.get("a")["seq"], "locked")
+    assert queue.pending() == []
+    assert queue.items()[0][1]["error"] == "locked"
+
+    queue.retry()
+    assert [wp for wp, _ in queue.pending()] == ["a"]
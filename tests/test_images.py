@@ -0,0 +1,63 @@
+import io
+import random
+
+import pytest
+
+from PIL import Image
+
+from DokuVimNG.images import encode
+
+
+def noise(width, height):
+    rnd = random.Random(0)
+    img = Image.new("RGB", (width, height))
+    img.putdata(
+        [
+            (rnd.randrange(256), rnd.randrange(256), rnd.randrange(256))
+            for _ in range(width * height)
+        ]
+    )
+    return img
+
+
+def test_encode_formats():
+    img = Image.new("RGBA", (40, 30), (255, 0, 0, 128))
+
+    data, ext = encode(img, "PNG")
+    assert ext == "png"
+    assert Image.open(io.BytesIO(data)).format == "PNG"
+
+    # jpeg has no alpha channel
+    data, ext = encode(img, "jpg")
+    assert ext == "jpg"
+    assert Image.open(io.BytesIO(data)).format == "JPEG"
+
+    with pytest.raises(ValueError):
+        encode(img, "bmp")
+
+
+def test_encode_scales_down_to_max_size():
+    data, _ = encode(Image.new("RGB", (400, 100)), "png", max_width=200)
+    assert Image.open(io.BytesIO(data)).size == (200, 50)
+
+    data, _ = encode(Image.new("RGB", (100, 50)), "png", max_width=200)
+    assert Image.open(io.BytesIO(data)).size == (100, 50)
+
+
+def test_encode_lowers_quality_before_scaling():
+    img = noise(200, 200)
+    unlimited, _ = encode(img, "jpeg", quality=95)
+
+    data, _ = encode(img, "jpeg", quality=95, max_bytes=len(unlimited) * 2 // 3)
+    assert len(data) <= len(unlimited) * 2 // 3
+    assert Image.open(io.BytesIO(data)).size == (200, 200)
+
+
+@pytest.mark.parametrize("image_format", ["png", "jpeg"])
+def test_encode_fits_byte_budget(image_format):
+    img = noise(200, 200)
+    unlimited, _ = encode(img, image_format)
+
+    data, _ = encode(img, image_format, max_bytes=len(unlimited) // 4)
+    assert len(data) <= len(unlimited) // 4
+    assert Image.open(io.BytesIO(data)).format == encode(img, image_format)[1].upper()
@@ -0,0 +1,71 @@
+from DokuVimNG.index import NamespaceTree, PageIndex, complete
+
+
+def test_namespace_tree_listing():
+    tree = NamespaceTree(["start", "ns:a", "ns:b", "ns:sub:c", "other:d"])
+
+    assert tree.listing("") == (["ns", "other"], ["start"])
+    assert tree.listing("ns:") == (["sub"], ["a", "b"])
+    assert tree.listing("ns:sub:") == ([], ["c"])
+    assert tree.listing("missing:") == ([], [])
+
+
+def test_namespace_tree_remove_prunes_empty_namespaces():
+    tree = NamespaceTree(["ns:a", "ns:sub:deep:c"])
+
+    tree.remove("ns:sub:deep:c")
+    assert tree.listing("ns:") == ([], ["a"])
+    assert tree.find("ns:sub:") is None
+
+    tree.remove("ns:a")
+    assert tree.listing("") == ([], [])
+
+    # removing unknown pages is a no-op
+    tree.remove("unknown:page")
+
+
+def test_complete_prefix_and_limit():
+    items = ["a", "ns:", "ns:a", "ns:b", "ns:c", "nt:a"]
+
+    assert complete(items, "ns:", 10) == ["ns:", "ns:a", "ns:b", "ns:c"]
+    assert complete(items, "ns:", 2) == ["ns:", "ns:a"]
+    assert complete(items, "x", 10) == []
+    assert complete(items, "", 3) == ["a", "ns:", "ns:a"]
+
+
+def test_page_index_sets_and_sorted_lists():
+    index = PageIndex(["ns:b", "start", "ns:a", "ns:sub:c"], ["ns:img.png"])
+
+    assert index.pages == ["ns:a", "ns:b", "ns:sub:c", "start"]
+    assert index.namespaces == ["ns:", "ns:sub:"]
+    assert index.entries == ["ns:", "ns:a", "ns:b", "ns:sub:", "ns:sub:c", "start"]
+    assert index.media == ["ns:img.png"]
+    assert "ns:a" in index and "ns:" not in index
+    assert len(index) == 4
+    assert index.tree.listing("ns:") == (["sub"], ["a", "b"])
+
+
+def test_page_index_incremental_updates():
+    index = PageIndex(["ns:a", "start"], ["ns:img.png"])
+
+    index.add_page("ns:sub:new")
+    index.add_page("ns:a")
+    assert index.pages == ["ns:a", "ns:sub:new", "start"]
+    assert index.namespaces == ["ns:", "ns:sub:"]
+    assert index.entries == ["ns:", "ns:a", "ns:sub:", "ns:sub:new", "start"]
+    assert index.tree.listing("ns:") == (["sub"], ["a"])
+
+    index.remove_page("ns:sub:new")
+    index.remove_page("ns:a")
+    index.remove_page("unknown")
+    assert index.pages == ["start"]
+    assert index.namespaces == []
+    assert index.entries == ["start"]
+    assert index.tree.listing("") == ([], ["start"])
+
+    index.add_media("a.png")
+    index.remove_media("ns:img.png")
+    assert index.media == ["a.png"]
+    assert index.media_set == {"a.png"}
+
+    assert index.entries == PageIndex(index.pages).entries
@@ -0,0 +1,48 @@
+from DokuVimNG.links import LinkGraph, parse, resolve
+
+
+def test_resolve():
+    assert resolve("ns:sub:", "page") == "ns:sub:page"
+    assert resolve("ns:sub:", ":top") == "top"
+    assert resolve("ns:sub:", "other:Some Page") == "other:some_page"
+    assert resolve("ns:sub:", ".:sibling") == "ns:sub:sibling"
+    assert resolve("ns:sub:", "..:up") == "ns:up"
+    assert resolve("ns:sub:", "ns2:") == "ns2:start"
+    assert resolve("ns:", "https://example.org") is None
+    assert resolve("ns:", "wp>Wiki") is None
+    assert resolve("ns:", "user@example.org") is None
+
+
+def test_parse():
+    text = (
+        "[[other|label]] [[ns:page]] [[#section]] [[self]] [[page#anchor]]\n"
+        "{{img.png?200|alt}} {{:top.png}} [[https://example.org]]"
+    )
+
+    pages, media = parse("ns:self", text)
+    assert pages == {"ns:other", "ns:page"}
+    assert media == {"ns:img.png", "top.png"}
+
+
+def test_link_graph():
+    graph = LinkGraph()
+    graph.add("a", "[[b]] [[c]] {{img.png}}")
+    graph.add("b", "[[c]] [[missing]]")
+    graph.add("c", "")
+
+    assert graph.forward("a") == (["b", "c"], ["img.png"])
+    assert graph.linking("c") == ["a", "b"]
+    assert graph.orphans(["a", "b", "c"]) == ["a"]
+    assert graph.dead_links({"a", "b", "c"}, set()) == [
+        ("a", "img.png"),
+        ("b", "missing"),
+    ]
+
+    graph.add("b", "[[b]] old contents kept", replace=False)
+    assert graph.linking("missing") == ["b"]
+
+    graph.add("a", "no links anymore")
+    assert graph.linking("c") == ["b"]
+    graph.remove("b")
+    assert graph.linking("c") == []
+    assert "b" not in graph
@@ -0,0 +1,75 @@
+import dokuwiki
+import pytest
+
+from fakewiki import FakeWiki, FakeWikiServer
+
+from DokuVimNG.multicall import MultiCall
+
+
+@pytest.fixture(params=[True, False], ids=["multicall", "fallback"])
+def server(request):
+    server = FakeWikiServer(FakeWiki(20), multicall=request.param).start()
+    server.multicall = request.param
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def client(server):
+    return dokuwiki.DokuWiki(server.url, "user", "pass", cookieAuth=True)
+
+
+def calls(server):
+    with server.counts_lock:
+        return sum(n for (kind, _), n in server.counts.items() if kind == "http")
+
+
+def test_results_in_call_order(server):
+    xmlrpc = client(server)
+    wp = server.wiki.ids[0]
+
+    multi = MultiCall(xmlrpc)
+    perm = multi.add("wiki.aclCheck", wp)
+    text = multi.add("wiki.getPage", wp)
+    before = calls(server)
+    multi.run()
+    sent = calls(server) - before
+
+    assert multi.result(perm) == server.wiki.acl_check(wp)
+    assert multi.result(text) == server.wiki.text(wp)
+    # without multicall support the failed attempt is followed by single calls
+    assert sent == (1 if server.multicall else 3)
+
+
+def test_unsupported_server_is_remembered(server):
+    xmlrpc = client(server)
+    for _ in range(2):
+        multi = MultiCall(xmlrpc)
+        multi.add("dokuwiki.getTime")
+        multi.add("dokuwiki.getVersion")
+        before = calls(server)
+        multi.run()
+
+    assert calls(server) - before == (1 if server.multicall else 2)
+
+
+def test_fault_mapping(server):
+    xmlrpc = client(server)
+
+    multi = MultiCall(xmlrpc)
+    missing = multi.add("wiki.getPageInfo", "does:not:exist")
+    unknown = multi.add("wiki.noSuchMethod")
+    multi.run()
+
+    # fault 121 is mapped to an empty result like DokuWiki.send() does
+    assert multi.result(missing) == {}
+    with pytest.raises(dokuwiki.DokuWikiError):
+        multi.result(unknown)
+
+
+def test_empty_run_sends_nothing(server):
+    xmlrpc = client(server)
+    before = calls(server)
+
+    assert MultiCall(xmlrpc).run() == []
+    assert calls(server) == before
@@ -0,0 +1,340 @@
+import os
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import pytest
+
+from fakewiki import FakeWiki, FakeWikiServer
+
+from DokuVimNG.cache import IndexCache, MediaHashes, PageCache, SaveQueue
+from DokuVimNG.dokuvimng import Buffer, DokuVimNG, import_dokuwiki
+from DokuVimNG.links import LinkGraph
+from DokuVimNG.search import FullTextIndex
+from DokuVimNG.wiki import Wiki
+
+
+class FakeBuffer:
+    """
+    Buffer of FakeNvim, holds its lines and b:changedtick.
+    """
+
+    def __init__(self, number, name):
+        self.number = self.handle = number
+        self.name = name
+        self.lines = [""]
+        self.tick = 1
+        self.api = SimpleNamespace(get_changedtick=lambda: self.tick)
+
+    def __getitem__(self, key):
+        return self.lines[key]
+
+    def set_lines(self, lines):
+        self.lines = list(lines) or [""]
+        self.tick += 1
+
+
+class Current:
+    """
+    Buffer of the current window of FakeNvim.
+    """
+
+    def __init__(self, nvim):
+        self.nvim = nvim
+
+    @property
+    def buffer(self):
+        return self.nvim.windows[self.nvim.winnr - 1]
+
+
+class FakeNvim:
+    """
+    Answers the nvim api calls of the plugin for a row of windows, enough to
+    open, edit and close page buffers without a running nvim.
+    """
+
+    def __init__(self):
+        self.buffers = {}
+        self.commands = []
+        self.messages = []
+        self.errors = []
+        self.scheduled = []
+        self.windows = [self.add_buffer("")]
+        self.winnr = 1
+        self.current = Current(self)
+        self.api = SimpleNamespace(call_atomic=self.call_atomic)
+
+    def add_buffer(self, name):
+        buf = FakeBuffer(len(self.buffers) + 1, name)
+        self.buffers[buf.number] = buf
+        return buf
+
+    def bufnr(self, name):
+        for buf in self.buffers.values():
+            if buf.name == name:
+                return buf.number
+        return -1
+
+    def command(self, cmd):
+        self.commands.append(cmd)
+        words = cmd.split()
+        if words[0] == "silent!":
+            words = words[1:]
+        if words[0] == "badd" and self.bufnr(os.path.abspath(words[1])) < 0:
+            self.add_buffer(os.path.abspath(words[1]))
+        elif words[0] == "buffer!" and int(words[1]) in self.buffers:
+            self.windows[self.winnr - 1] = self.buffers[int(words[1])]
+        elif words[0] == "bdel!":
+            self.buffers.pop(int(words[1]), None)
+        elif words[0].endswith("vsplit"):
+            self.windows.insert(self.winnr - 1, self.current.buffer)
+        elif words[0].endswith("wincmd"):
+            self.winnr = int(words[0][: -len("wincmd")])
+
+    def call(self, fn, *args):
+        if fn == "winbufnr":
+            return self.windows[args[0] - 1].number
+        if fn == "bufnr":
+            return self.bufnr(os.path.abspath(args[0]))
+
+    def eval(self, expr):
+        if expr == "winnr()":
+            return self.winnr
+
+    def out_write(self, msg):
+        self.messages.append(msg)
+
+    def err_write(self, msg):
+        self.errors.append(msg)
+
+    def async_call(self, fn, *args):
+        self.scheduled.append((fn, args))
+
+    def run_scheduled(self):
+        """
+        Runs the calls scheduled by worker threads like the event loop would.
+        """
+
+        while self.scheduled:
+            fn, args = self.scheduled.pop(0)
+            fn(*args)
+
+    def call_atomic(self, calls):
+        results = []
+        for method, args in calls:
+            result = None
+            if method == "nvim_command":
+                self.command(args[0])
+            elif method == "nvim_call_function":
+                result = self.call(args[0], *args[1])
+            elif method == "nvim_get_current_buf":
+                result = self.current.buffer
+            elif method == "nvim_buf_get_changedtick":
+                result = args[0].tick
+            elif method == "nvim_buf_set_lines":
+                args[0].set_lines(args[4])
+            elif method == "nvim_out_write":
+                self.out_write(args[0])
+            results.append(result)
+        return results, None
+
+
+@pytest.fixture
+def server():
+    server = FakeWikiServer(FakeWiki(20)).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def plugin(server, tmp_path):
+    """
+    Plugin connected to the fake wiki like after init(), with its caches in
+    tmp_path.
+    """
+
+    import_dokuwiki()
+    plugin = DokuVimNG(FakeNvim())
+    plugin.current = Wiki(server.url, "user", "pass")
+    plugin.wikis[plugin.current.alias] = plugin.current
+    plugin.initialized = True
+    plugin.diffmode = False
+    plugin.cfg = {"async_save": False, "save_retry": 30, "index_max_age": 0}
+    plugin.default_sum = "xmlrpc edit"
+
+    plugin.clients = threading.local()
+    plugin.xmlrpc = plugin.clients.xmlrpc = plugin.connect()
+    plugin.buffers = {
+        name: Buffer(plugin._nvim, name, "nofile") for name in ["index", "queue"]
+    }
+    plugin.needs_refresh = False
+    plugin.cur_ns = ""
+    plugin.index_cache = IndexCache(tmp_path / "index.json")
+    plugin.index_cache.reset(server.wiki.ids, [], 0)
+    plugin.build_index()
+    plugin.page_cache = PageCache(tmp_path / "pages")
+    plugin.fulltext = FullTextIndex(tmp_path / "fulltext")
+    plugin.links = LinkGraph()
+    plugin.saver = ThreadPoolExecutor(max_workers=1)
+    plugin.save_retry = None
+    plugin.offline = False
+    plugin.save_queue = SaveQueue(tmp_path / "journal.jsonl")
+    yield plugin
+    plugin.saver.shutdown()
+
+
+def settle(plugin):
+    """
+    Waits for the queued saves to be written and runs their callbacks.
+    """
+
+    plugin.saver.submit(lambda: None).result()
+    plugin._nvim.run_scheduled()
+
+
+def open_page(plugin, wp, text):
+    """
+    Opens a page buffer holding the saved text of the page.
+    """
+
+    buffer = plugin.buffers[wp] = Buffer(plugin._nvim, wp, "acwrite", True)
+    buffer.buf.set_lines(text.split("\n"))
+    buffer.saved(text, buffer.buf.tick)
+    return buffer
+
+
+@pytest.mark.parametrize("async_save", [False, True])
+def test_saving_an_empty_buffer_removes_the_page(plugin, server, async_save):
+    plugin.cfg["async_save"] = async_save
+    wp = server.wiki.ids[0]
+    buffer = open_page(plugin, wp, server.wiki.text(wp))
+    plugin.index_text(wp, server.wiki.text(wp))
+
+    buffer.buf.set_lines([])
+    plugin.save()
+    settle(plugin)
+
+    assert not plugin._nvim.errors
+    assert not server.wiki.exists(wp)
+    # the buffer of the removed page is closed
+    assert wp not in plugin.buffers
+    assert buffer.num not in plugin._nvim.buffers
+    assert wp not in plugin.page_index
+    assert wp not in plugin.fulltext
+
+
+def test_closing_pages_of_an_unreachable_wiki(plugin, server):
+    first, second = server.wiki.ids[:2]
+    for wp in (first, second):
+        open_page(plugin, wp, server.wiki.text(wp))
+
+    server.shutdown()
+    server.server_close()
+    # drop the kept alive connection, the next call connects again
+    plugin.xmlrpc.proxy("close")()
+
+    assert plugin.close(first)
+    assert plugin.close_pages(False) == []
+    assert first not in plugin.buffers
+    assert second not in plugin.buffers
+
+
+def test_created_pages_become_searchable(plugin, server):
+    plugin.prefetcher = ThreadPoolExecutor(max_workers=2)
+    server.wiki.put_page("new:page", "a page created elsewhere")
+    info = server.wiki.get_page_info("new:page")
+
+    plugin.apply_changes([{"name": "new:page", "version": info["version"], "size": 24}])
+    plugin.prefetcher.shutdown()
+
+    assert plugin.fulltext.search("elsewhere") == [
+        ("new:page", 1, "a page created elsewhere")
+    ]
+    assert plugin.fulltext.version("new:page") == info["version"]
+
+
+@pytest.mark.parametrize("max_age", [0, 7 * 86400])
+def test_index_older_than_max_age_is_fetched_again(plugin, server, max_age):
+    plugin.cfg["index_max_age"] = max_age
+    plugin.media_hashes = MediaHashes()
+    # the last sync is older than the changes the wiki keeps
+    plugin.index_cache.reset([], [], server.wiki.now - 30 * 86400)
+
+    cache, changes = plugin.fetch_index(plugin.xmlrpc)
+
+    if max_age:
+        assert changes == []
+        assert cache.pages == set(server.wiki.ids)
+    else:
+        assert changes
+
+
+def test_find_media_by_the_hash_of_the_wiki(plugin, server):
+    plugin.media_hashes = MediaHashes()
+    server.wiki.put_attachment("ns0:images:shot.png", b"png data")
+
+    assert plugin.find_media(b"png data", "ns0:images:") == "ns0:images:shot.png"
+    assert plugin.find_media(b"other data", "ns0:images:") is None
+
+
+def test_connecting_another_wiki_keeps_the_edit_window(plugin, server, tmp_path):
+    nvim = plugin._nvim
+    wp = server.wiki.ids[0]
+    page = open_page(plugin, wp, server.wiki.text(wp))
+    # the layout after init(), the index left of the page
+    nvim.command("vsplit")
+    nvim.command("buffer! {}".format(plugin.buffers["index"].num))
+    nvim.command("2wincmd w")
+
+    plugin.cfg.update(
+        urls=[],
+        cache_dir=str(tmp_path / "cache"),
+        page_cache_size=10,
+        revision_cache_size=10,
+        save_summary="",
+        image_sub_ns="images",
+        index_winwidth=40,
+        async_refresh=False,
+        prefetch=False,
+    )
+    other = FakeWikiServer(FakeWiki(5)).start()
+    try:
+        plugin.dw_url, plugin.dw_user, plugin.dw_pass = other.url, "user", "pass"
+        assert plugin.init()
+    finally:
+        other.shutdown()
+        other.server_close()
+
+    assert len(plugin.wikis) == 2
+    assert nvim.windows == [nvim.buffers[plugin.buffers["index"].num], page.buf]
+    assert nvim.winnr == 2
+
+
+def test_background_refresh_keeps_local_index_updates(plugin, server):
+    plugin.cfg["index_max_age"] = 0
+    plugin.worker = ThreadPoolExecutor(max_workers=1)
+    plugin.prefetcher = ThreadPoolExecutor(max_workers=1)
+    plugin.set_status = lambda *args, **kwargs: None
+    removed = server.wiki.ids[0]
+    plugin.index_cache.timestamp = server.wiki.now
+    plugin.media_hashes = MediaHashes()
+
+    # the worker copies the index before these updates
+    started = threading.Event()
+    release = threading.Event()
+    plugin.worker.submit(lambda: (started.set(), release.wait()))
+    plugin.refresh(background=True)
+    started.wait()
+    plugin.update_index(pages=["local:page"])
+    plugin.update_index(pages=[removed], removed=True)
+    release.set()
+    plugin.worker.shutdown()
+    plugin._nvim.run_scheduled()
+
+    assert not plugin.refreshing
+    assert "local:page" in plugin.page_index
+    assert removed not in plugin.page_index
+    assert "local:page" in plugin.index_cache.pages
+    assert removed not in plugin.index_cache.pages
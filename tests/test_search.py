@@ -0,0 +1,77 @@
+from DokuVimNG.search import FullTextIndex
+
+
+def index():
+    fulltext = FullTextIndex()
+    fulltext.add("a", "first line\nthe quick brown fox\nlast line", 1)
+    fulltext.add("b", "a quick test\nbrown bear", 2)
+    fulltext.add("c", "nothing here", 3)
+    return fulltext
+
+
+def test_words_must_all_match():
+    fulltext = index()
+
+    assert fulltext.search("quick brown") == [
+        ("a", 2, "the quick brown fox"),
+        ("b", 1, "a quick test"),
+        ("b", 2, "brown bear"),
+    ]
+    assert fulltext.search("quick missing") == []
+    assert fulltext.search("   ") == []
+
+
+def test_phrases_and_whole_words():
+    fulltext = index()
+
+    assert fulltext.search('"quick brown"') == [("a", 2, "the quick brown fox")]
+    assert fulltext.search("QUICK") == [
+        ("a", 2, "the quick brown fox"),
+        ("b", 1, "a quick test"),
+    ]
+    assert fulltext.search("bro") == []
+
+
+def test_update_and_remove():
+    fulltext = index()
+    fulltext.add("c", "a quick change", 4)
+    fulltext.remove("a")
+
+    assert [wp for wp, _, _ in fulltext.search("quick")] == ["b", "c"]
+    assert fulltext.version("c") == 4
+    assert "a" not in fulltext
+
+
+def test_save_and_load(tmp_path):
+    fulltext = FullTextIndex(tmp_path / "fulltext")
+    fulltext.add("a", "stored on disk", 1)
+    fulltext.add("b", "a quick test\nbrown bear", 2)
+    fulltext.save()
+    assert not fulltext.dirty
+    # the contents are only kept on disk
+    assert not fulltext.texts
+
+    loaded = FullTextIndex(tmp_path / "fulltext")
+    loaded.load()
+    assert loaded.search("bear") == [("b", 2, "brown bear")]
+    assert loaded.version("b") == 2
+
+    loaded.remove("a")
+    assert not loaded.file("a").exists()
+    assert loaded.search("disk") == []
+
+
+def test_save_later(tmp_path):
+    fulltext = FullTextIndex(tmp_path / "fulltext", delay=0.05)
+    fulltext.add("a", "first", 1)
+    fulltext.save_later()
+    timer = fulltext.timer
+    fulltext.add("b", "second", 2)
+    fulltext.save_later()
+    # the pending save writes both changes
+    assert fulltext.timer is timer
+    timer.join()
+
+    loaded = FullTextIndex(tmp_path / "fulltext")
+    loaded.load()
+    assert "a" in loaded and "b" in loaded
@@ -0,0 +1,25 @@
+from DokuVimNG.stats import Stats, format_bytes, percentile
+
+
+def test_percentile_and_format_bytes():
+    assert percentile([], 0.5) == 0.0
+    assert percentile([3, 1, 2], 0.5) == 2
+    assert percentile([1, 2, 3, 4], 0.95) == 4
+    assert format_bytes(512) == "512B"
+    assert format_bytes(2048) == "2K"
+
+
+def test_report_orders_by_total_time(tmp_path):
+    trace = tmp_path / "trace.jsonl"
+    stats = Stats(str(trace))
+    stats.record("xmlrpc", "wiki.getPage", 0.010, 100, 2000)
+    stats.record("xmlrpc", "wiki.getPage", 0.030, 100, 2000)
+    stats.record("nvim", "nvim_command", 0.001)
+
+    lines = stats.report()
+    assert lines[1].split()[:3] == ["xmlrpc", "wiki.getPage", "2"]
+    assert lines[2].split()[:3] == ["nvim", "nvim_command", "1"]
+    assert len(trace.read_text().splitlines()) == 3
+
+    stats.reset()
+    assert len(stats.report()) == 1
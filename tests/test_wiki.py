@@ -0,0 +1,41 @@
+import threading
+
+from DokuVimNG.dokuvimng import DokuVimNG
+from DokuVimNG.wiki import Wiki, wiki_alias
+
+
+def test_wiki_alias():
+    assert wiki_alias("https://wiki.example.org") == "wiki.example.org"
+    assert wiki_alias("https://wiki.example.org/doku/") == "wiki.example.org_doku"
+    assert wiki_alias("http://localhost:8080/") == "localhost_8080"
+
+
+def test_wiki_prefix():
+    assert Wiki("https://a.org", "u", "p").prefix == ""
+    assert Wiki("https://a.org", "u", "p", True).prefix == "a.org/"
+
+
+def test_plugin_attributes_follow_the_wiki():
+    first = Wiki("https://a.org", "u", "p")
+    second = Wiki("https://b.org", "u", "p")
+    plugin = DokuVimNG(None)
+
+    plugin.current = first
+    plugin.cur_ns = "ns:"
+    plugin.current = second
+    plugin.cur_ns = "other:"
+
+    assert first.cur_ns == "ns:"
+    assert second.cur_ns == "other:"
+
+    # jobs keep the wiki they were started for
+    assert plugin.in_wiki(first, lambda: plugin.cur_ns) == "ns:"
+    assert plugin.cur_ns == "other:"
+
+    result = []
+    thread = threading.Thread(
+        target=plugin.in_wiki, args=(first, lambda: result.append(plugin.wiki))
+    )
+    thread.start()
+    thread.join()
+    assert result == [first]